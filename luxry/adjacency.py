@@ -0,0 +1,37 @@
+from .util import C, Direction
+
+
+class Adjacency:
+    '''Static neighbor tables for a size x size board, indexed by cell id.
+
+    neighbor_ids[cell_id]: ids of the on-board neighbors, in Cell::neighbors() order (N E S W)
+    move_ids[cell_id]: ids indexed by direction (Direction.CENTER is the cell itself); None if the
+                       move would leave the board
+    Built once per map size (see adjacency()) and shared by every board/turn. Search loops can
+    iterate neighbor_ids directly; there are no bounds checks left to do.
+    '''
+    def __init__(self, size):
+        self.size = size
+        neighbor_ids, move_ids = [], []
+        for cid in range(size * size):
+            x, y = cid % size, cid // size
+            ids = []
+            for dx, dy in C.MOVE_DELTAS:
+                nx, ny = x + dx, y + dy
+                ids.append(ny * size + nx if 0 <= nx < size and 0 <= ny < size else None)
+            move_ids.append(tuple(ids))
+            neighbor_ids.append(tuple(ids[d] for d in (Direction.NORTH, Direction.EAST,
+                                                        Direction.SOUTH, Direction.WEST)
+                                      if ids[d] is not None))
+        self.neighbor_ids = tuple(neighbor_ids)
+        self.move_ids = tuple(move_ids)
+
+
+_adjacencies = {}  # {size: Adjacency}
+
+
+def adjacency(size):
+    '''Return the (shared) Adjacency for a size x size board'''
+    if size not in _adjacencies:
+        _adjacencies[size] = Adjacency(size)
+    return _adjacencies[size]
@@ -0,0 +1,218 @@
+'''Micro-benchmarks for board data structures. From the repo root: python -m luxry.benchmark'''
+import random
+import sys
+import time
+
+from lux.config import EnvConfig
+
+from .agent_act import simulate_step
+from .board import Board
+from .board_state import BoardState
+from .mode_default import ModeDefault
+from .role_miner import RoleMiner
+from .strategy import Strategy
+from .util import C
+
+
+def synthetic_obs(size=48, factories_per_player=3, units_per_factory=8, seed=0):
+    '''Return an observation dict with a random map and a mid-game number of units'''
+    rng = random.Random(seed)
+
+    def grid(fn):
+        return [[fn() for _ in range(size)] for _ in range(size)]
+
+    board = {
+        'ice': grid(lambda: int(rng.random() < 0.03)),
+        'ore': grid(lambda: int(rng.random() < 0.03)),
+        'rubble': grid(lambda: rng.choice([0, 0, rng.randint(1, 19), rng.randint(20, 100)])),
+        'lichen': grid(lambda: 0),
+        'lichen_strains': grid(lambda: -1),
+    }
+
+    factories, units, teams = {}, {}, {}
+    unit_id = 0
+    for team_id in range(2):
+        player_id = f'player_{team_id}'
+        factories[player_id], units[player_id] = {}, {}
+        strains = []
+        for k in range(factories_per_player):
+            factory_id = team_id * factories_per_player + k
+            x, y = 4 + 8 * k, (size // 4) if team_id == 0 else (3 * size // 4)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    board['ice'][x+dx][y+dy], board['ore'][x+dx][y+dy] = 0, 0
+                    board['rubble'][x+dx][y+dy] = 0
+            factories[player_id][f'factory_{factory_id}'] = {
+                'strain_id': factory_id, 'team_id': team_id, 'pos': [x, y], 'power': 1000,
+                'cargo': {'ice': 0, 'ore': 0, 'water': 500, 'metal': 100}}
+            strains.append(factory_id)
+            for _ in range(units_per_factory):
+                ux, uy = rng.randrange(size), rng.randrange(size)
+                unit_type = 'HEAVY' if rng.random() < 0.3 else 'LIGHT'
+                units[player_id][f'unit_{unit_id}'] = {
+                    'unit_id': f'unit_{unit_id}', 'team_id': team_id, 'pos': [ux, uy],
+                    'unit_type': unit_type, 'power': 100, 'action_queue': [],
+                    'cargo': {'ice': 0, 'ore': 0, 'water': 0, 'metal': 0}}
+                unit_id += 1
+        teams[player_id] = {'water': 0, 'metal': 0, 'factory_strains': strains}
+    return {'board': board, 'factories': factories, 'units': units, 'teams': teams}
+
+
+def entity_bytes(obj):
+    '''Return the size of obj plus its instance dict, if any (attribute values not included)'''
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def attribute_reads_per_sec(objs, attrs, reps=20):
+    getters = [compile(f'for o in objs: o.{a}', '<bench>', 'exec') for a in attrs]
+    t = time.perf_counter()
+    for _ in range(reps):
+        for getter in getters:
+            exec(getter, {'objs': objs})
+    return reps * len(getters) * len(objs) / (time.perf_counter() - t)
+
+
+def carry_forward_dense(state, i, max_rubble, decay_strains, lost, gained, max_lichen):
+    '''Reference per-cell version of BoardState::carry_forward()'''
+    state.rubble[i+1] = [min(r1 + r0, max_rubble)
+                         for r0, r1 in zip(state.rubble[i], state.rubble[i+1])]
+    lichen1 = [max(0, min(max_lichen,
+                          l1 + l0 - lost if s0 in decay_strains
+                          else l1 + l0 + gained if l0 > 0
+                          else l1 + l0))
+               for l0, l1, s0 in zip(state.lichen[i], state.lichen[i+1], state.lichen_strain[i])]
+    state.lichen[i+1] = lichen1
+    state.lichen_strain[i+1] = [-1 if l1 == 0 else s0 if s1 == -1 else s1
+                                for l1, s0, s1 in zip(lichen1, state.lichen_strain[i],
+                                                      state.lichen_strain[i+1])]
+
+
+def carry_forward_check(size=48, steps=50, seed=0):
+    '''Run both carry-forward versions on the same random planes; return (dense s, sparse s)'''
+    rng = random.Random(seed)
+    obs = synthetic_obs(size=size, seed=seed)
+    obs['board']['lichen'] = [[rng.choice([0] * 8 + [rng.randint(1, 100)]) for _ in range(size)]
+                              for _ in range(size)]
+    obs['board']['lichen_strains'] = [[rng.randrange(6) if obs['board']['lichen'][x][y] else -1
+                                       for y in range(size)] for x in range(size)]
+    states = [BoardState(size), BoardState(size)]
+    for state in states:
+        state.load_obs(obs['board'])
+    args = (100, {0, 1, 2, -1}, 1, 1, 100)
+
+    times = []
+    for state, fn in zip(states, [carry_forward_dense, BoardState.carry_forward]):
+        rng = random.Random(seed)
+        elapsed = 0
+        for i in range(steps):
+            # Sparse deltas, as digs/waterings/destroyed units would write them
+            for _ in range(20):
+                cid = rng.randrange(size * size)
+                state.rubble[i+1][cid] += rng.randint(-20, 20)
+                state.lichen[i+1][cid] += rng.randint(-5, 5)
+                state.lichen_strain[i+1][cid] = rng.choice([-1, -1, rng.randrange(6)])
+            t = time.perf_counter()
+            fn(state, i, *args)
+            elapsed += time.perf_counter() - t
+        times.append(elapsed)
+
+    for name in ['rubble', 'lichen', 'lichen_strain']:
+        assert getattr(states[0], name) == getattr(states[1], name), name
+    return times
+
+
+def lod_run(obs, future_len):
+    '''Simulate future_len steps of obs with C.LOD_PROFILE; return (seconds, unit timelines)'''
+    strategy = Strategy()
+    board = Board.from_obs(obs, 'player_0', 0, EnvConfig(), strategy)
+    t = time.perf_counter()
+    for step in range(future_len):
+        simulate_step(board, step, strategy)
+    elapsed = time.perf_counter() - t
+
+    actions = board.get_new_actions(verbose=False)
+    timelines = {unit.id: (list(zip(unit.x, unit.y)), unit.power[future_len],
+                           actions.get(f'unit_{unit.id}'))
+                 for unit in board.player.units() if unit.id < 900000}
+    return elapsed, timelines
+
+
+def lod_report(future_len=40, seed=0, reps=3):
+    '''Compare each of C.LOD_PROFILES with 'full' over one simulation of a synthetic board.
+
+    Returns [(profile, s (best of reps), position match, power error, new action queue match)]: the fraction of
+    (unit, step index) positions equal to those of the full simulation, the mean absolute
+    difference in unit power at the last step index, and the fraction of units whose new action
+    queue (i.e. what would be submitted) is identical.
+    '''
+    saved = C.FUTURE_LEN, C.LOD_PROFILE
+    C.FUTURE_LEN = future_len
+    obs = synthetic_obs(seed=seed)
+    try:
+        runs = {}
+        for profile in C.LOD_PROFILES:
+            C.LOD_PROFILE = profile
+            runs[profile] = min((lod_run(obs, future_len) for _ in range(reps)),
+                                key=lambda run: run[0])
+    finally:
+        C.FUTURE_LEN, C.LOD_PROFILE = saved
+
+    rows = []
+    full = runs['full'][1]
+    for profile, (elapsed, timelines) in runs.items():
+        positions = [p == q for uid in full for p, q in zip(full[uid][0], timelines[uid][0])]
+        power_error = sum(abs(full[uid][1] - timelines[uid][1]) for uid in full) / len(full)
+        queue_match = sum(full[uid][2] == timelines[uid][2] for uid in full) / len(full)
+        rows.append((profile, elapsed, sum(positions) / len(positions), power_error, queue_match))
+    return rows
+
+
+def main():
+    obs = synthetic_obs()
+    env_cfg = EnvConfig()
+    strategy = Strategy()
+
+    t = time.perf_counter()
+    board = Board.from_obs(obs, 'player_0', 0, env_cfg, strategy, skip_routes=True)
+    first_ms = 1000 * (time.perf_counter() - t)
+    t = time.perf_counter()
+    board = Board.from_obs(obs, 'player_0', 1, env_cfg, strategy, skip_routes=True)
+    reuse_ms = 1000 * (time.perf_counter() - t)
+
+    units = list(board.units.values())
+    factories = list(board.factories.values())
+    factory = board.player.factories()[0]
+    unit = board.player.units()[0]
+    samples = {
+        'Cell': board.cells[0],
+        'Unit': unit,
+        'Factory': factory,
+        'Player': board.player,
+        'RoleMiner': RoleMiner(board.step, unit, factory, board.cells[0]),
+        'ModeDefault': ModeDefault(board.step, factory),
+    }
+
+    print(f'from_obs: {first_ms:.1f}ms first, {reuse_ms:.1f}ms reused')
+    for name, obj in samples.items():
+        print(f'{name}: {entity_bytes(obj)} bytes')
+    print(f'{len(board.cells)} cells: {entity_bytes(board.cells[0]) * len(board.cells)} bytes')
+    for name, objs, attrs in [('Cell', board.cells, ['x', 'ice', 'factory_id', 'lowland_id']),
+                              ('Unit', units, ['id', 'type', 'role', 'player_id']),
+                              ('Factory', factories, ['id', 'x', 'mode', 'player_id'])]:
+        rate = attribute_reads_per_sec(objs, attrs, reps=max(20, 50000 // len(objs)))
+        print(f'{name} attribute reads: {rate / 1e6:.1f}M/s')
+
+    dense, sparse = carry_forward_check()
+    print(f'carry_forward (50 steps, identical output): {1000 * dense:.1f}ms per-cell, '
+          f'{1000 * sparse:.1f}ms sparse')
+
+    for profile, elapsed, positions, power_error, queues in lod_report():
+        print(f'LOD {profile}: {1000 * elapsed:.0f}ms, {100 * positions:.1f}% positions, '
+              f'{power_error:.1f} power error, {100 * queues:.1f}% action queues')
+
+
+if __name__ == '__main__':
+    main()
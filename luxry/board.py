@@ -4,15 +4,24 @@ import math
 import sys
 import time
 
+from .adjacency import adjacency
+from .board_state import BoardState, flatten
 from .cell import Cell
+from .dist_field import DistField
 from .factory import Factory
+from .factory_map import FactoryMap
 from .mode_from_serial import mode_from_serial
 from .mode_default import ModeDefault
 from .mode_forge import ModeForge
 from .mode_ice_conflict import ModeIceConflict
+from .opp_context import OppContext
 from .player import Player
+from .reservations import ReservationTable
 from .role_from_serial import role_from_serial
+from .spatial_index import SpatialIndex
+from .strategy import BoardCache
 from .unit import Unit
+from .unit_history import UnitHistory
 from .util import C, Action, Direction, Resource, log, profileit
 
 
@@ -24,12 +33,28 @@ class Board:
         self.opp = None
         self.size = None
         self.cells = []
+        self.state = None  # BoardState; per-step cell data, shared with Cell views
+        self.adjacency = None  # Adjacency; static neighbor tables, shared across boards
         self.units = {}
         self.factories = {}
         self.env_cfg = None
 
         self.dist_call_id = 0  # used by .dist()
-        self._opp_mines = None  # cached at the beginning of each invocation
+        self._dist_cost = []  # [cost], indexed by cell id; only valid if _dist_call matches
+        self._dist_dist = []  # [dist], indexed by cell id
+        self._dist_parent = []  # [Cell], indexed by cell id; used by ._route()
+        self._dist_call = []  # [dist_call_id], indexed by cell id
+        self.rubble_version = 0  # incremented whenever rubble changes mid-step; used by .dist_field()
+        self.dist_stats = {}  # {call site: [calls, expansions]}; if C.DIST_STATS
+        self.phase_stats = {}  # {phase: [calls, visited, acted]}; if C.PHASE_STATS
+        self._dist_fields = {}  # {key: DistField}, cleared at the beginning of each step
+        self._spatial_indexes = {}  # {(step, unit count): SpatialIndex}, cleared like _dist_fields
+        self._factory_maps = {}  # {player_id: FactoryMap}, see .factory_map()
+        self.unit_version = 0  # bumped on unit role/assigned factory changes; see Factory::units()
+        self._avoid_masks = {}  # {key: [bool]}, built on demand by .avoid_mask()
+        self.reservations = None  # ReservationTable, created once factories are known
+        self.opp_context = None  # OppContext, built at the beginning of each invocation
+        self.lod = frozenset()  # simplifications at the current step index; see C.LOD_PROFILES
 
     def summary(self, step):
         i = step - self.step
@@ -37,21 +62,18 @@ class Board:
         pf = len(self.player.factories())
         of = len(self.opp.factories())
 
-        player_units = self.player.units()
-        plu = sum(u.type == 'LIGHT' for u in player_units)
-        phu = len(player_units) - plu
+        plu = len(self.player.units('LIGHT'))
+        phu = len(self.player.units('HEAVY'))
 
-        opp_units = self.opp.units()
-        olu = sum(u.type == 'LIGHT' for u in opp_units)
-        ohu = len(opp_units) - olu
+        olu = len(self.opp.units('LIGHT'))
+        ohu = len(self.opp.units('HEAVY'))
 
         pp = round(sum(x.power[i] for x in self.player.factories() + self.player.units()) / 1000, 1)
         op = round(sum(x.power[i] for x in self.opp.factories() + self.opp.units()) / 1000, 1)
 
-        pl = sum(c.lichen[i] for c in self.cells
-                 if c.lichen[i] and c.lichen_strain[i] in self.player.strains)
-        ol = sum(c.lichen[i] for c in self.cells
-                 if c.lichen[i] and c.lichen_strain[i] in self.opp.strains)
+        lichen, lichen_strain = self.state.lichen[i], self.state.lichen_strain[i]
+        pl = sum(x for x, s in zip(lichen, lichen_strain) if x and s in self.player.strains)
+        ol = sum(x for x, s in zip(lichen, lichen_strain) if x and s in self.opp.strains)
 
         return f'{pf}-{of}F, {phu}-{ohu}HU, {plu}-{olu}LU, {pp}-{op}kP, {pl}-{ol}L'
 
@@ -134,18 +156,46 @@ class Board:
                                obs['teams'][opp_id]['metal'],
                                obs["teams"][opp_id]['factory_strains'])
 
-        # Cells
-        for y in range(board.size):
-            for x in range(board.size):
-                cell = Cell(board,
-                            x,
-                            y,
-                            obs['board']['ice'][x][y],
-                            obs['board']['ore'][x][y],
-                            obs['board']['rubble'][x][y],
-                            obs['board']['lichen'][x][y],
-                            obs['board']['lichen_strains'][x][y])
-                board.cells.append(cell)
+        # Unit position history is kept for the whole game; cells hold views into it
+        if strategy.unit_history is None or strategy.unit_history.size != board.size:
+            strategy.unit_history = UnitHistory(board.size)
+            strategy.board_cache = None
+
+        # Cells and their per-step state are persisted across invocations; reset and reuse them
+        board.adjacency = adjacency(board.size)
+        cache = strategy.board_cache
+        if cache and cache.size == board.size:
+            board.state, board.cells = cache.state, cache.cells
+            board.state.load_obs(obs['board'])
+            for cell, ice, ore in zip(board.cells,
+                                      flatten(obs['board']['ice']),
+                                      flatten(obs['board']['ore'])):
+                cell.reset(board, ice, ore)
+        else:
+            board.state = BoardState(board.size)
+            board.state.load_obs(obs['board'])
+            for y in range(board.size):
+                for x in range(board.size):
+                    cell = Cell(board,
+                                x,
+                                y,
+                                obs['board']['ice'][x][y],
+                                obs['board']['ore'][x][y])
+                    board.cells.append(cell)
+            cells = board.cells
+            for cell, neighbor_ids, move_ids in zip(cells,
+                                                    board.adjacency.neighbor_ids,
+                                                    board.adjacency.move_ids):
+                cell.neighbor_cells = [cells[nid] for nid in neighbor_ids]
+                cell.move_cells = tuple(None if mid is None else cells[mid] for mid in move_ids)
+            strategy.board_cache = BoardCache(board)
+
+        # Search state used by dist(), preallocated once per board
+        n = len(board.cells)
+        board._dist_cost = [C.UNREACHABLE] * n
+        board._dist_dist = [C.UNREACHABLE] * n
+        board._dist_parent = [None] * n
+        board._dist_call = [-1] * n
 
         # Factories
         for _, factories_info in obs['factories'].items():
@@ -165,6 +215,14 @@ class Board:
                 board.factories[factory_id] = factory
                 board.cell(x, y).register_factory(factory)
 
+        # Nearest-factory maps are kept across invocations until a factory is placed or explodes
+        if set(board.factories) != strategy.factory_map_ids:
+            strategy.factory_maps = {}
+            strategy.factory_map_ids = set(board.factories)
+
+        # Unit positions are reserved as they are registered from here on
+        board.reservations = ReservationTable(board)
+
         # Units
         for _, units_info in obs['units'].items():
             for _, unit_info in units_info.items():
@@ -192,7 +250,6 @@ class Board:
                 factory.set_routes(strategy)  # Need lowland info first
         for cell in board.cells:
             cell.set_factory_dists(strategy)
-            cell.set_unit_history(strategy)
 
         # Update units/cells with persisted roles/goals from previous invocation
         for factory_id, mode_data in strategy.modes.items():
@@ -209,6 +266,7 @@ class Board:
                 unit = board.units[unit_id]
                 # Assign decoded role, but don't call set_role until update_roles_and_goals
                 unit.role = role_from_serial(step, unit, role_data)
+                board.unit_version += 1
             else:
                 strategy.check_dead_unit(unit_id)
 
@@ -220,9 +278,9 @@ class Board:
         for unit_id, factory_id in strategy.unit_assigned_factories.items():
             if unit_id in board.units:
                 unit = board.units[unit_id]
-                unit.assigned_factory = (board.factories[factory_id]
-                                         if factory_id in board.factories
-                                         else None)
+                unit.assign_factory(board.factories[factory_id]
+                                    if factory_id in board.factories
+                                    else None)
                 if factory_id not in board.factories:
                     strategy.check_dead_factory(factory_id)
 
@@ -277,24 +335,7 @@ class Board:
                             queue.append(new_cell)
 
     def opp_mines(self, heavy=None, ice=None):
-        # The first call is made by Board::begin_step_simulation and returns a list of tuples
-        # Later calls filter that list down to desired subsets and return a list of cells
-        if self._opp_mines is not None:
-            ret = []
-            for cell, unit in self._opp_mines:
-                if ((heavy is None or heavy == (unit.type == 'HEAVY'))
-                    and (ice is None or (ice and cell.ice) or (not ice and cell.ore))):
-                    ret.append(cell)
-            return ret
-
-        mines = set()
-        for unit in self.opp.units():
-            if ((heavy is not None) and heavy != (unit.type == 'HEAVY')):
-                continue
-            unit_mines = unit.get_mines(ice=ice)
-            for unit_mine in unit_mines:
-                mines.add((unit_mine, unit))
-        return list(mines)
+        return self.opp_context.mines(heavy=heavy, ice=ice)
 
     def set_lowland_info(self, strategy):
         # If in strategy, load and return
@@ -347,9 +388,12 @@ class Board:
         self.player.lichen_disconnected_cells = []
         self.opp.lichen_disconnected_cells = []
 
+        lichen, lichen_connected = self.state.lichen[i], self.state.lichen_connected[i]
+        lichen_strain = self.state.lichen_strain[i]
         for cell in self.cells:
-            if cell.lichen[i] > 0 and cell.lichen_connected[i] == False:
-                if cell.lichen_strain[i] in self.player.strains:
+            cid = cell.id
+            if lichen[cid] > 0 and lichen_connected[cid] == False:
+                if lichen_strain[cid] in self.player.strains:
                     self.player.lichen_disconnected_cells.append(cell)
                 else:
                     self.opp.lichen_disconnected_cells.append(cell)
@@ -362,95 +406,95 @@ class Board:
             strategy.save_factory_routes(self)
             strategy.save_cell_lowland_info(self)
             strategy.save_cell_factory_dists(self)
-            strategy.save_cell_unit_history(self)  # Updated over time, but consistent reference
 
-        # Update persisted cell unit history before first step index
+        # Update persisted unit history before first step index
         if i == 0:
+            strategy.unit_history.record(self)
+            if C.PLAN_STATS:
+                strategy.plan_forecast.compare(self, strategy.unit_history)
             for unit in self.units.values():
-                unit.cell(step).unit_history[step] = unit.id
                 strategy.save_unit_stats_begin(unit)
-            self._opp_mines = self.opp_mines()
+            self.opp_context = OppContext(self)
+
+        # Cached distance fields and unit indexes are only valid for a single step index
+        self._dist_fields = {}
+        self._spatial_indexes = {}
+
+        # Simplifications for this step index (never the first); see C.LOD_PROFILES
+        self.lod = frozenset(name for name, start in C.LOD_PROFILES[C.LOD_PROFILE].items()
+                             if i >= max(1, start))
 
         # Update lichen info so that power gain info is known for role updates
         # This will need to be re-calculated later after dig actions are made to determine water price
+        # Coarse lichen: keep the previous step's cell lists and connected counts instead
+        coarse_lichen = 'coarse_lichen' in self.lod
+        if coarse_lichen:
+            self.state.lichen_connected[i] = self.state.lichen_connected[i-1][:]
         for factory in self.factories.values():
-            factory.calculate_lichen_count(step)
-            factory.calculate_lichen_dists(step)
+            if coarse_lichen:
+                factory.lichen_count[i] = factory.lichen_count[i-1]
+            else:
+                factory.calculate_lichen_count(step)
+                factory.calculate_lichen_dists(step)
             # TODO: hack
             factory._power_gain = factory.power_gain(step)
             factory._power_usage = factory.power_usage(step)
         # After lichen calculation(s), identify disconnected lichen cells (only idx 0?)
-        self.identify_disconnected_lichen(step)
+        if not coarse_lichen:
+            self.identify_disconnected_lichen(step)
 
     # TODO: handle self-collisions
     def end_step_simulation(self, step, strategy):
         i = step - self.step
 
         # Set next step's factory power and resources
+        cfg = self.env_cfg
+        water_rate, ice_water_ratio = cfg.FACTORY_PROCESSING_RATE_WATER, cfg.ICE_WATER_RATIO
+        metal_rate, ore_metal_ratio = cfg.FACTORY_PROCESSING_RATE_METAL, cfg.ORE_METAL_RATIO
         for factory in self.player.factories():
-            factory.power[i+1] += factory.power[i]
-            factory.power[i+1] += factory.power_gain(step)
+            factory.power[i+1] += factory.power[i] + factory.power_gain(step)
             assert factory.power[i+1] >= 0
 
-            new_water = (min(self.env_cfg.FACTORY_PROCESSING_RATE_WATER, factory.ice[i])
-                         // self.env_cfg.ICE_WATER_RATIO)
-            factory.water[i+1] += factory.water[i]
-            factory.water[i+1] += new_water
-            factory.water[i+1] -= self.env_cfg.FACTORY_WATER_CONSUMPTION
-            factory.ice[i+1] += factory.ice[i]
-            factory.ice[i+1] -= new_water * self.env_cfg.ICE_WATER_RATIO
+            ice, ore = factory.ice[i], factory.ore[i]
+            new_water = min(water_rate, ice) // ice_water_ratio
+            new_metal = min(metal_rate, ore) // ore_metal_ratio
+            factory.water[i+1] += factory.water[i] + new_water - cfg.FACTORY_WATER_CONSUMPTION
+            factory.ice[i+1] += ice - new_water * ice_water_ratio
+            factory.metal[i+1] += factory.metal[i] + new_metal
+            factory.ore[i+1] += ore - new_metal * ore_metal_ratio
             assert factory.ice[i+1] >= 0
-
-            new_metal = (min(self.env_cfg.FACTORY_PROCESSING_RATE_METAL, factory.ore[i])
-                         // self.env_cfg.ORE_METAL_RATIO)
-            factory.metal[i+1] += factory.metal[i]
-            factory.metal[i+1] += new_metal
-            factory.ore[i+1] += factory.ore[i]
-            factory.ore[i+1] -= new_metal * self.env_cfg.ORE_METAL_RATIO
             assert factory.ore[i+1] >= 0
             assert factory.metal[i+1] >= 0
 
-        # Set next step's unit power and resources
+        # Set next step's unit power and resources; power gain only depends on type and step
         # TODO: enforce cargo limits
+        is_day = step % cfg.CYCLE_LENGTH < cfg.DAY_LENGTH
         for unit in self.player.units():
             unit.ice[i+1] += unit.ice[i]
             unit.ore[i+1] += unit.ore[i]
             unit.water[i+1] += unit.water[i]
             unit.metal[i+1] += unit.metal[i]
-            unit.power[i+1] += unit.power[i]
-            unit.power[i+1] += unit.power_gain(step)
-            unit.power[i+1] = min(unit.power[i+1], unit.cfg.BATTERY_CAPACITY)
+            power = unit.power[i+1] + unit.power[i] + (unit.cfg.CHARGE if is_day else 0)
+            unit.power[i+1] = min(power, unit.cfg.BATTERY_CAPACITY)
             assert unit.ice[i+1] >= 0
             assert unit.ore[i+1] >= 0
             assert unit.water[i+1] >= 0
             assert unit.metal[i+1] >= 0
 
-        # Set next step's cell rubble/lichen
-        for cell in self.cells:
-            cell.rubble[i+1] += cell.rubble[i]
-            cell.rubble[i+1] = min(cell.rubble[i+1], self.env_cfg.MAX_RUBBLE)
-
-            # Assume opp lichen will grow, decrement everything else.
-            cell.lichen[i+1] += cell.lichen[i]
-            if (cell.lichen_strain[i] == -1) or (cell.lichen_strain[i] in self.player.strains):
-                cell.lichen[i+1] -= self.env_cfg.LICHEN_LOST_WITHOUT_WATER
-            elif cell.lichen[i] > 0:
-                cell.lichen[i+1] += self.env_cfg.LICHEN_GAINED_WITH_WATER
-
-            # Bound lichen to min/max range.
-            cell.lichen[i+1] = min(cell.lichen[i+1], self.env_cfg.MAX_LICHEN_PER_TILE)
-            cell.lichen[i+1] = max(cell.lichen[i+1], 0)
-
-            # Set lichen strain
-            if cell.lichen[i+1] == 0:
-                cell.lichen_strain[i+1] = -1
-            elif cell.lichen_strain[i+1] == -1:
-                # Carryover lichen strain if not explicitly set
-                cell.lichen_strain[i+1] = cell.lichen_strain[i]
+        # Set next step's cell rubble/lichen/strain, a whole plane at a time
+        # Assume opp lichen will grow, decrement everything else.
+        # Strain -1 never matches, so it is included in the decrementing strains.
+        self.state.carry_forward(i,
+                                 self.env_cfg.MAX_RUBBLE,
+                                 self.player.strains | {-1},
+                                 self.env_cfg.LICHEN_LOST_WITHOUT_WATER,
+                                 self.env_cfg.LICHEN_GAINED_WITH_WATER,
+                                 self.env_cfg.MAX_LICHEN_PER_TILE)
 
         # Update factory assignments for units and cells:
         for unit in self.player.units():
-            unit.assigned_factory = unit.role.get_factory() if unit.role else unit.assigned_factory
+            if unit.role:
+                unit.assign_factory(unit.role.get_factory())
 
             if (unit.role
                 and ((unit.role.NAME == 'miner' and unit.role.resource_cell.ice)
@@ -484,6 +528,9 @@ class Board:
             for cell in self.cells:
                 strategy.save_resource_assigned_factory(cell)
 
+            if C.PLAN_STATS:
+                strategy.plan_forecast.record(self)
+
     def get_new_actions(self, verbose=True):
         '''Add new/altered action queues to the actions dict'''
         actions = {}
@@ -523,7 +570,9 @@ class Board:
 
     def get_assigned_cells(self, step):
         i = step - self.step
-        return [x for x in self.cells if x.assigned_unit_id[i] is not None]
+        cells = self.cells
+        return [cells[cid] for cid, unit_id in enumerate(self.state.assigned_unit_id[i])
+                if unit_id is not None]
 
     def update_roles_and_goals(self, step):
         '''
@@ -579,6 +628,8 @@ class Board:
             if (unit.player_id == self.player.id
                 or (i == 0 and unit.player_id == self.opp.id)):
                 unit.update_low_power_flag(step)
+        if i == 0:
+            self.opp_context.set_low_power_units()
 
         # Check for units that meet special role-changing criteria
         for unit in self.player.units():
@@ -622,9 +673,293 @@ class Board:
         route, cell = [], dest_cell
         while cell:
             route.append(cell)
-            cell = cell.dist_temp[2]
+            cell = self._dist_parent[cell.id]
         return list(reversed(route))
 
+    def dist_field(self, step, src, unit=None, avoid_cond=None, avoid_mask=None, avoid_key=None,
+                   unit_move_cost=None, unit_rubble_movement_cost=None):
+        '''Return a (possibly cached) DistField from src to every cell on the board.
+
+        Fields are cached by step, cost params, sources, and avoid_key. The caller is responsible
+        for choosing an avoid_key that uniquely identifies avoid_cond/avoid_mask for the current
+        step. If either is given without an avoid_key, the field is not cached.
+        '''
+        if isinstance(src, Cell):
+            src = [src]
+
+        # Assume HEAVY if unit is unspecified
+        if unit_move_cost is None:
+            unit_move_cost = unit.cfg.MOVE_COST if unit else 20  # hardcoded
+        if unit_rubble_movement_cost is None:
+            unit_rubble_movement_cost = unit.cfg.RUBBLE_MOVEMENT_COST if unit else 1  # hardcoded
+        player_id = unit.player_id if unit else None
+
+        key = None
+        if (avoid_cond is None and avoid_mask is None) or avoid_key is not None:
+            key = (step, self.rubble_version, unit_move_cost, unit_rubble_movement_cost,
+                   player_id, tuple(c.id for c in src), avoid_key)
+            if key in self._dist_fields:
+                return self._dist_fields[key]
+
+        field = DistField(self, step, src,
+                          player_id=player_id,
+                          avoid_cond=avoid_cond,
+                          avoid_mask=avoid_mask,
+                          unit_move_cost=unit_move_cost,
+                          unit_rubble_movement_cost=unit_rubble_movement_cost)
+        if key is not None:
+            self._dist_fields[key] = field
+        return field
+
+    def factory_map(self, player_id=None):
+        '''Return the FactoryMap for the factories Cell::nearest_factory() considers for player_id'''
+        if player_id not in self._factory_maps:
+            if player_id is None:
+                factories = self.player.factories()
+            elif player_id == 'all':
+                factories = list(self.factories.values())
+            else:
+                factories = [f for f in self.factories.values() if f.player_id == player_id]
+            key = tuple(f.id for f in factories)
+            if key not in self.strategy.factory_maps:
+                self.strategy.factory_maps[key] = FactoryMap(self.size, factories)
+            self._factory_maps[player_id] = self.strategy.factory_maps[key]
+        return self._factory_maps[player_id]
+
+    def spatial_index(self, step):
+        '''Return the SpatialIndex of unit positions at step; rebuilt if units are added'''
+        key = (step, len(self.units))
+        if key not in self._spatial_indexes:
+            self._spatial_indexes[key] = SpatialIndex(self, step)
+        return self._spatial_indexes[key]
+
+    def avoid_mask(self, name, unit=None, player_id=None):
+        '''Return [bool] indexed by cell id for a named avoidance policy; built once per board.
+
+        Masks only capture conditions that are fixed for the whole invocation. Conditions that
+        change as units are simulated (e.g. cells assigned to other units) should be passed to
+        dist() as a cheap avoid_cond overlay alongside the mask.
+          near_opp_factory: within 3 cells of an opp factory
+          careful_light: factory centers and cells near stationary opp units that could beat unit
+          factory_ice: factory cells, plus ice and cells next to opp factories for player_id
+          factory_ice_ore: same as factory_ice, plus ore
+        '''
+        if name == 'careful_light':
+            key = (name, unit.power[0])
+        elif name in ('factory_ice', 'factory_ice_ore'):
+            key = (name, player_id)
+        else:
+            key = (name,)
+        if key in self._avoid_masks:
+            return self._avoid_masks[key]
+
+        if name == 'near_opp_factory':
+            mask = [False] * len(self.cells)
+            for factory in self.opp.factories():
+                factory_cell = factory.cell()
+                for dx in range(-4, 5):
+                    for dy in range(-4, 5):
+                        cell = factory_cell.neighbor(dx, dy)
+                        if cell and cell.man_dist_factory(factory) <= 3:
+                            mask[cell.id] = True
+        elif name == 'careful_light':
+            threat_power = self._careful_light_threat_power()
+            power = unit.power[0]
+            mask = [p > power for p in threat_power]
+        elif name in ('factory_ice', 'factory_ice_ore'):
+            ore = (name == 'factory_ice_ore')
+            mask = [bool(c.factory()
+                         or (player_id == self.player.id
+                             and (c.ice
+                                  or (ore and c.ore)
+                                  or any(n for n in c.neighbors()
+                                         if n.factory() and n.factory().player_id != player_id))))
+                    for c in self.cells]
+        else:
+            assert False
+
+        self._avoid_masks[key] = mask
+        return mask
+
+    def _careful_light_threat_power(self):
+        '''Return [int] indexed by cell id; a LIGHT with less power should avoid the cell'''
+        key = ('careful_light_threat_power',)
+        if key in self._avoid_masks:
+            return self._avoid_masks[key]
+
+        # Factory centers and opp heavies on resources are always avoided.
+        threat_power = [(C.UNREACHABLE
+                         if (c.factory_center
+                             or ((c.ice or c.ore)
+                                 and c.unit(self.step)
+                                 and c.unit(self.step).type == 'HEAVY'
+                                 and c.unit(self.step).player_id == self.opp.id))
+                         else -1)
+                        for c in self.cells]
+
+        # Stationary opp units threaten their own and neighboring cells.
+        # TODO this feels like an improvement, avoiding standoffs
+        #      only consider opp units on ice/ore/factory cells
+        for unit in self.opp.units():
+            if not unit.is_stationary(self.step, 5):
+                continue
+            power = C.UNREACHABLE if unit.type == 'HEAVY' else unit.power[0]
+            unit_cell = unit.cell(self.step)
+            for cell in [unit_cell] + unit_cell.neighbors():
+                threat_power[cell.id] = max(threat_power[cell.id], power)
+
+        self._avoid_masks[key] = threat_power
+        return threat_power
+
+    def dist_to_goal(self, step, src, unit, dest_cell, avoid_cond=None, avoid_mask=None,
+                     unit_move_cost=None, unit_rubble_movement_cost=None):
+        '''Return {cell_id: cost} of the cheapest route from each src cell to dest_cell.
+
+        Searches backward from dest_cell until every src cell is settled, so one call can replace
+        a dist(step, src_cell, unit, dest_cell=dest_cell, avoid_cond=avoid_cond) call per src cell.
+        Costs match dist() as long as dest_cell is not a factory center (dist() substitutes a
+        dest_cond in that case). Unreachable src cells are omitted.
+        '''
+        i = step - self.step
+        if unit_move_cost is None:
+            unit_move_cost = unit.cfg.MOVE_COST if unit else 20  # hardcoded
+        if unit_rubble_movement_cost is None:
+            unit_rubble_movement_cost = unit.cfg.RUBBLE_MOVEMENT_COST if unit else 1  # hardcoded
+        rubble = self.state.rubble[i]
+
+        # Consistent heuristic: every step of a route costs at least unit_move_cost
+        targets = set(cell.id for cell in src)
+        heuristic = lambda c: unit_move_cost * min(c.man_dist(s) for s in src)
+
+        costs, done = {dest_cell.id: 0}, {}
+        queue, heap_unique = [(heuristic(dest_cell), 0, 0, dest_cell)], 0  # astar, cost, unique, cell
+        while queue and targets:
+            _, cost, _, cell = heapq.heappop(queue)
+            if cell.id in done:
+                continue
+            done[cell.id] = cost
+            targets.discard(cell.id)
+
+            # Cannot move into opponent factories
+            if unit and cell.factory() and cell.factory().player_id != unit.player_id:
+                continue
+
+            # Routes may end on an avoided dest_cell, but cannot pass through other avoided cells.
+            if cell is not dest_cell and ((avoid_mask and avoid_mask[cell.id])
+                                          or (avoid_cond and avoid_cond(step, cell))):
+                continue
+
+            # Any neighbor pays the cost of moving onto this cell
+            new_cost = math.floor(cost
+                                  + unit_move_cost
+                                  + unit_rubble_movement_cost * rubble[cell.id])
+            for new_cell in cell.neighbors():
+                if new_cost < costs.get(new_cell.id, C.UNREACHABLE):
+                    costs[new_cell.id] = new_cost
+                    heap_unique += 1
+                    heapq.heappush(queue, (new_cost + heuristic(new_cell), new_cost, heap_unique, new_cell))
+
+        return {cell.id: done[cell.id] for cell in src if cell.id in done}
+
+    def dist_bidirectional(self, step, src_cell, unit, dest_cells, avoid_cond=None, avoid_mask=None,
+                           unit_move_cost=None, unit_rubble_movement_cost=None):
+        '''Return (int, int, [Cell]) representing cost, distance, and route from src_cell.
+
+        Bidirectional Dijkstra between src_cell and the nearest of dest_cells, for single-source
+        point-to-point queries. Same semantics as dist() with dest_cond=lambda s,c: c in dest_cells:
+        src/dest cells can be avoided, but other avoided cells cannot be passed through.
+        Ties between equal-cost routes may be broken differently than dist().
+        '''
+        i = step - self.step
+        if unit_move_cost is None:
+            unit_move_cost = unit.cfg.MOVE_COST if unit else 20  # hardcoded
+        if unit_rubble_movement_cost is None:
+            unit_rubble_movement_cost = unit.cfg.RUBBLE_MOVEMENT_COST if unit else 1  # hardcoded
+        rubble = self.state.rubble[i]
+
+        cells = self.cells
+        if any(c is src_cell for c in dest_cells):
+            return 0, 0, [src_cell]
+
+        def enter_cost(cell):
+            if unit and cell.factory() and cell.factory().player_id != unit.player_id:
+                return None
+            return math.floor(unit_move_cost + unit_rubble_movement_cost * rubble[cell.id])
+
+        def passable(cell):
+            return not ((avoid_mask and avoid_mask[cell.id])
+                        or (avoid_cond and avoid_cond(step, cell)))
+
+        # Forward: cost of reaching a cell from src_cell. Backward: cost from a cell to dest.
+        f_cost, f_parent = {src_cell.id: 0}, {src_cell.id: None}
+        b_cost, b_next = {}, {}
+        f_queue, b_queue, heap_unique = [(0, 0, src_cell.id)], [], 0  # cost, unique, cell_id
+        for cell in dest_cells:
+            if enter_cost(cell) is not None:
+                b_cost[cell.id], b_next[cell.id] = 0, None
+                heap_unique += 1
+                b_queue.append((0, heap_unique, cell.id))
+        dest_ids = set(b_cost)
+        f_done, b_done = set(), set()
+
+        best_cost, meet = C.UNREACHABLE, None  # meet = (cell_id, cell_id) forward edge
+        while f_queue and b_queue and f_queue[0][0] + b_queue[0][0] < best_cost:
+            if f_queue[0][0] <= b_queue[0][0]:
+                cost, _, cid = heapq.heappop(f_queue)
+                if cid in f_done:
+                    continue
+                f_done.add(cid)
+                cell = cells[cid]
+                if cell is not src_cell and (cid in dest_ids or not passable(cell)):
+                    continue
+                for new_cell in cell.neighbors():
+                    nid = new_cell.id
+                    new_cost = enter_cost(new_cell)
+                    if new_cost is None:
+                        continue
+                    new_cost += cost
+                    if nid in b_cost and new_cost + b_cost[nid] < best_cost:
+                        best_cost, meet = new_cost + b_cost[nid], (cid, nid)
+                    if new_cost < f_cost.get(nid, C.UNREACHABLE):
+                        f_cost[nid], f_parent[nid] = new_cost, cid
+                        heap_unique += 1
+                        heapq.heappush(f_queue, (new_cost, heap_unique, nid))
+            else:
+                cost, _, cid = heapq.heappop(b_queue)
+                if cid in b_done:
+                    continue
+                b_done.add(cid)
+
+                # Any neighbor that can be passed through pays the cost of moving onto this cell
+                new_cost = cost + enter_cost(cells[cid])
+                for new_cell in cells[cid].neighbors():
+                    nid = new_cell.id
+                    if new_cell is src_cell:
+                        if new_cost < best_cost:
+                            best_cost, meet = new_cost, (nid, cid)
+                        continue
+                    if not passable(new_cell) or enter_cost(new_cell) is None:
+                        continue
+                    if nid in f_cost and f_cost[nid] + new_cost < best_cost:
+                        best_cost, meet = f_cost[nid] + new_cost, (nid, cid)
+                    if new_cost < b_cost.get(nid, C.UNREACHABLE):
+                        b_cost[nid], b_next[nid] = new_cost, cid
+                        heap_unique += 1
+                        heapq.heappush(b_queue, (new_cost, heap_unique, nid))
+
+        if meet is None:
+            return C.UNREACHABLE, C.UNREACHABLE, []
+        route, cid = [], meet[0]
+        while cid is not None:
+            route.append(cells[cid])
+            cid = f_parent[cid]
+        route.reverse()
+        cid = meet[1]
+        while cid is not None:
+            route.append(cells[cid])
+            cid = b_next[cid]
+        return best_cost, len(route) - 1, route
+
     def naive_cost_around_factory(self, step, unit, factory, src_cell, dest_cell,
                                   clockwise=None, ret_route=False):
         i = step - self.step
@@ -720,10 +1055,13 @@ class Board:
 
     #@profileit
     def dist(self, step, src, unit,
-             dest_cell=None, dest_cond=None, avoid_cond=None,
+             dest_cell=None, dest_cond=None, avoid_cond=None, avoid_mask=None,
              unit_move_cost=None, unit_rubble_movement_cost=None,
              cost_lim=None, dist_lim=None, timeout_ms=None):
-        '''Return (int, int, Cell) representing cost, distance, and destination cell'''
+        '''Return (int, int, Cell) representing cost, distance, and destination cell
+
+        avoid_mask is a [bool] from avoid_mask(); avoid_cond may be given as well as an overlay.
+        '''
         i = step - self.step
         self.dist_call_id += 1
         self._dist_loop_count = 0
@@ -744,7 +1082,7 @@ class Board:
                 dest_cond = lambda s,c: (c.factory() is dest_factory
                                          and (not c.assigned_unit(s)
                                               or c.assigned_unit(s) is unit))
-                if avoid_cond is None:
+                if avoid_cond is None and avoid_mask is None:
                     # Cannot go "through" the dest factory e.g. if a cell has an assigned unit
                     avoid_cond = lambda _,c: (c.factory() is dest_factory)
 
@@ -753,6 +1091,12 @@ class Board:
             unit_move_cost = unit.cfg.MOVE_COST if unit else 20  # hardcoded
         if unit_rubble_movement_cost is None:
             unit_rubble_movement_cost = unit.cfg.RUBBLE_MOVEMENT_COST if unit else 1  # hardcoded
+        rubble = self.state.rubble[i]
+
+        cells = self.cells
+        call_id = self.dist_call_id
+        d_cost, d_dist, d_parent, d_call = (
+            self._dist_cost, self._dist_dist, self._dist_parent, self._dist_call)
 
         # Set up the initial heap.
         queue, heap_unique = [], 0
@@ -762,31 +1106,59 @@ class Board:
             #if dest_cell and not dist_lim:
             #    dist_lim = 4 + 2 * src.man_dist(dest_cell) # TODO
             src = [src]
+
+        # Opp factory cells can never be entered
+        if (dest_cell
+            and not dest_cond
+            and unit
+            and dest_cell.factory()
+            and dest_cell.factory().player_id != unit.player_id
+            and dest_cell not in src):
+            return C.UNREACHABLE, C.UNREACHABLE, None
+
         for cell in src:
-            # cost, dist, cell, call_id
-            cell.dist_temp = (0, 0, None, self.dist_call_id)
+            cid = cell.id
+            d_cost[cid], d_dist[cid], d_parent[cid], d_call[cid] = 0, 0, None, call_id
             heap_unique += 1
             astar_cost = (0
                           if dest_cell is None
                           else unit_move_cost * cell.man_dist(dest_cell))
-            heapq.heappush(queue,
-                           (astar_cost, 0, 0, heap_unique, cell))  # astar, cost, dist, unique, cell
+            heapq.heappush(queue, (astar_cost, 0, 0, heap_unique, cid))  # astar, cost, dist, unique, cell_id
 
         while queue:
-            _, cost, dist, _, cell = heapq.heappop(queue)
+            _, cost, dist, _, cid = heapq.heappop(queue)
+            cell = cells[cid]
             self._dist_loop_count += 1
-            if self._dist_loop_count > 1500 and i == 0 and unit:
-                self._dist_loop_count = -C.UNREACHABLE
-                s = f'{unit} ({unit.role and unit.role.NAME}, goal={unit.role and unit.role.goal})'
-                s += f' {src} -> {dest_cell}/{dest_cond}'
-                log(s)
+            if self._dist_loop_count == 1501:
+                if i == 0 and unit:
+                    s = f'{unit} ({unit.role and unit.role.NAME}, goal={unit.role and unit.role.goal})'
+                    s += f' {src} -> {dest_cell}/{dest_cond}'
+                    log(s)
+
+                # Long searches are often for destinations walled off by opp factories.
+                if (dest_cell
+                    and not dest_cond
+                    and unit
+                    and not self._dist_reachable(unit.player_id, src, dest_cell)):
+                    if C.DIST_STATS:
+                        self._update_dist_stats()
+                    return C.UNREACHABLE, C.UNREACHABLE, None
 
             # If the best remaining option is over cost_lim, we are done.
             if cost_lim is not None and cost > cost_lim:
+                if C.DIST_STATS:
+                    self._update_dist_stats()
                 return C.UNREACHABLE, C.UNREACHABLE, None
 
+            # A stale entry for an already expanded cell cannot improve anything unless dist_lim
+            # pruned the earlier expansion.
+            if cost > d_cost[cid] and dist_lim is None:
+                continue
+
             # Check for terminal condition; return cost, distance, and dest cell
             if cell is dest_cell or (dest_cond and dest_cond(step, cell)):
+                if C.DIST_STATS:
+                    self._update_dist_stats()
                 return cost, dist, cell
 
             # TODO does not work as intended
@@ -806,9 +1178,11 @@ class Board:
 
             # After checking for terminal condition, determine if this cell can be passed through.
             # Source cells (dist = 0) can be passed through by default.
-            if dist > 0 and avoid_cond and avoid_cond(step, cell):
+            if dist > 0 and ((avoid_mask and avoid_mask[cid])
+                             or (avoid_cond and avoid_cond(step, cell))):
                 continue
 
+            new_dist = dist + 1
             for new_cell in cell.neighbors():
                 # Cannot move through opponent factories
                 if unit and new_cell.factory() and new_cell.factory().player_id != unit.player_id:
@@ -817,29 +1191,89 @@ class Board:
                 # Note: rubble[step+dist] is not known at step
                 new_cost = math.floor(cost
                                       + unit_move_cost
-                                      + unit_rubble_movement_cost * new_cell.rubble[i])
-                new_dist = dist + 1
+                                      + unit_rubble_movement_cost * rubble[new_cell.id])
 
                 # If this cell has not been initiated for this call to dist(), do it now.
-                if new_cell.dist_temp[3] != self.dist_call_id:
-                    # cost, dist, cell, call_id
-                    new_cell.dist_temp = (C.UNREACHABLE, C.UNREACHABLE, None, self.dist_call_id)
+                nid = new_cell.id
+                if d_call[nid] != call_id:
+                    d_cost[nid], d_call[nid] = C.UNREACHABLE, call_id
 
                 # If this is the best known route to new_cell, update its stats and add to heap.
-                if new_cost < new_cell.dist_temp[0]:
-                    # cost, dist, cell, call_id
-                    new_cell.dist_temp = (new_cost, new_dist, cell, self.dist_call_id)
+                if new_cost < d_cost[nid]:
+                    d_cost[nid], d_dist[nid], d_parent[nid] = new_cost, new_dist, cell
                     heap_unique += 1
                     astar_cost = new_cost + (0
                                              if dest_cell is None
                                              else unit_move_cost * new_cell.man_dist(dest_cell))
-                    heapq.heappush(queue, (astar_cost, new_cost, new_dist, heap_unique, new_cell))
+                    heapq.heappush(queue, (astar_cost, new_cost, new_dist, heap_unique, nid))
 
-        if self._dist_loop_count < 0:
+        if self._dist_loop_count > 1500 and i == 0 and unit:
             elapsed = round(1000000 * (time.time() - start_time))
             log(f'dist() did not find destination; t={elapsed}us')
+        if C.DIST_STATS:
+            self._update_dist_stats()
         return C.UNREACHABLE, C.UNREACHABLE, None  # cost, dist, cell
 
+    def _dist_reachable(self, player_id, src, dest_cell):
+        '''Return False if no src cell is connected to dest_cell around player's opp factories'''
+        key = ('components', player_id)
+        if key not in self._avoid_masks:
+            # Label connected components of cells that player's units can enter
+            component = [None] * len(self.cells)
+            for factory in self.factories.values():
+                if factory.player_id != player_id:
+                    for cell in [factory.cell()] + factory.cells():
+                        component[cell.id] = -1
+            next_id = 0
+            for cell in self.cells:
+                if component[cell.id] is not None:
+                    continue
+                component[cell.id] = next_id
+                stack = [cell]
+                while stack:
+                    for neighbor in stack.pop().neighbors():
+                        if component[neighbor.id] is None:
+                            component[neighbor.id] = next_id
+                            stack.append(neighbor)
+                next_id += 1
+            self._avoid_masks[key] = component
+
+        # src cells may be opp factory cells (-1); routes can leave them in any direction
+        component = self._avoid_masks[key]
+        dest_component = component[dest_cell.id]
+        for cell in src:
+            if component[cell.id] == dest_component:
+                return True
+            if component[cell.id] == -1 and any(component[c.id] == dest_component
+                                                for c in cell.neighbors()):
+                return True
+        return False
+
+    def _update_dist_stats(self):
+        # Attribute this dist() call to the function that called dist() or route()
+        frame = sys._getframe(2)
+        if frame.f_code.co_name == 'route' and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        site = f'{frame.f_code.co_filename.split("/")[-1]}:{frame.f_code.co_name}'
+        if site not in self.dist_stats:
+            self.dist_stats[site] = [0, 0]
+        stats = self.dist_stats[site]
+        stats[0] += 1
+        stats[1] += self._dist_loop_count
+
+    def dist_stats_summary(self):
+        lines = ['dist() calls/expansions per call site:']
+        for site, (calls, expansions) in sorted(self.dist_stats.items(), key=lambda x: -x[1][1]):
+            lines.append(f'  {site}: {calls} {expansions} ({round(expansions / calls)}/call)')
+        return '\n'.join(lines)
+
+    def phase_stats_summary(self):
+        lines = ['EntityGroup phase calls/visited/acted:']
+        for phase, (calls, visited, acted) in sorted(self.phase_stats.items(),
+                                                     key=lambda x: -x[1][1]):
+            lines.append(f'  {phase}: {calls} {visited} {acted}')
+        return '\n'.join(lines)
+
     def opp_is_tigga(self, step):
         assert step == 2
         validate_count = 0
@@ -0,0 +1,116 @@
+from itertools import compress
+
+from .util import C
+
+
+class BoardState:
+    '''Per-step cell state for the FUTURE_LEN simulation, stored as planes.
+
+    Each field is a list of FUTURE_LEN+1 planes (one per step index); each plane is a flat list
+    indexed by cell id. Whole-board passes can work on a plane at a time, and hot loops can bind a
+    plane once instead of going through Cell attributes. Cells expose the same data through
+    CellField views, e.g. cell.rubble[i] is state.rubble[i][cell.id]. Planes are lists rather than
+    numpy arrays because nearly all reads are single cells from Python code.
+    '''
+    def __init__(self, size):
+        self.size = size
+        self.rubble = [None] * (C.FUTURE_LEN + 1)
+        self.lichen = [None] * (C.FUTURE_LEN + 1)
+        self.lichen_strain = [None] * (C.FUTURE_LEN + 1)
+        self.lichen_connected = [None] * (C.FUTURE_LEN + 1)
+        self.unit_id = [None] * (C.FUTURE_LEN + 1)
+        self.assigned_unit_id = [None] * (C.FUTURE_LEN + 1)
+
+    def load_obs(self, obs_board):
+        '''Reset all planes, then set step index 0 from obs['board'] (indexed [x][y])'''
+        n = self.size * self.size
+        for k in range(C.FUTURE_LEN + 1):
+            # Assign in place; CellField views hold the outer lists
+            self.rubble[k] = [0] * n
+            self.lichen[k] = [0] * n
+            self.lichen_strain[k] = [-1] * n
+            self.lichen_connected[k] = [False] * n
+            self.unit_id[k] = [None] * n
+            self.assigned_unit_id[k] = [None] * n
+        self.rubble[0] = flatten(obs_board['rubble'])
+        self.lichen[0] = flatten(obs_board['lichen'])
+        self.lichen_strain[0] = flatten(obs_board['lichen_strains'])
+
+    def carry_forward(self, i, max_rubble, decay_strains, lichen_lost, lichen_gained, max_lichen):
+        '''Add plane i into the deltas written to plane i+1 for rubble/lichen and set strains.
+
+        Lichen of decay_strains decreases by lichen_lost, other lichen grows by lichen_gained;
+        lichen_strain carries over unless set, and is -1 without lichen. Only cells with a nonzero
+        input can change, so those are found with compress() and the rest are bulk copies. This is
+        faster than numpy here because the planes are lists and would need converting both ways.
+        '''
+        n = self.size * self.size
+        cell_ids = range(n)
+
+        # Rubble: r0 + r1, capped; r1 is a delta that is almost always 0
+        rubble0, rubble1 = self.rubble[i], self.rubble[i+1]
+        rubble = rubble0[:]
+        for k in compress(cell_ids, rubble1):
+            rubble[k] = min(rubble0[k] + rubble1[k], max_rubble)
+        self.rubble[i+1] = rubble
+
+        # Lichen/strain: cells with neither lichen nor a delta end up 0/-1 whatever their strain
+        lichen0, lichen1 = self.lichen[i], self.lichen[i+1]
+        strain0, strain1 = self.lichen_strain[i], self.lichen_strain[i+1]
+        lichen, strain = [0] * n, [-1] * n
+        for k in set(compress(cell_ids, lichen0)).union(compress(cell_ids, lichen1)):
+            l0, l = lichen0[k], lichen0[k] + lichen1[k]
+            if strain0[k] in decay_strains:
+                l -= lichen_lost
+            elif l0 > 0:
+                l += lichen_gained
+            l = max(0, min(max_lichen, l))
+            if l:
+                lichen[k] = l
+                strain[k] = strain0[k] if strain1[k] == -1 else strain1[k]
+        self.lichen[i+1] = lichen
+        self.lichen_strain[i+1] = strain
+
+
+def flatten(grid):
+    '''Return a list indexed by cell id (y * size + x) from a grid indexed [x][y]'''
+    return [v for column in zip(*grid) for v in column]
+
+
+class CellField:
+    '''One cell's column of a BoardState field; indexed by step index like a list'''
+    __slots__ = ('planes', 'cell_id')
+
+    def __init__(self, planes, cell_id):
+        self.planes = planes
+        self.cell_id = cell_id
+
+    def __getitem__(self, i):
+        return self.planes[i][self.cell_id]
+
+    def __setitem__(self, i, value):
+        self.planes[i][self.cell_id] = value
+
+    def __len__(self):
+        return len(self.planes)
+
+    def __iter__(self):
+        cell_id = self.cell_id
+        return (plane[cell_id] for plane in self.planes)
+
+
+_timeline_tails = {}  # {FUTURE_LEN: (zeros, nones, empty)}
+
+
+def timeline_tails():
+    '''Return preallocated tails for entity timelines of length FUTURE_LEN+1, built once.
+
+    zeros/nones are [0]/[None] * FUTURE_LEN; a timeline is built as [value] + tail, with a single
+    allocation. empty is a read-only timeline of empty tuples, shared by all entities whose
+    timeline of lists is never written (e.g. protectors of opp units).
+    '''
+    if C.FUTURE_LEN not in _timeline_tails:
+        _timeline_tails[C.FUTURE_LEN] = ([0] * C.FUTURE_LEN,
+                                         [None] * C.FUTURE_LEN,
+                                         ((),) * (C.FUTURE_LEN + 1))
+    return _timeline_tails[C.FUTURE_LEN]
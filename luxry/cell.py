@@ -1,39 +1,53 @@
 import math
 import sys
 
+from .board_state import CellField
 from .strategy import CellCache
-from .util import C, Action, Direction, log
+from .unit_history import HistoryField
+from .util import Action, Direction, log
 
 
 class Cell:
-    def __init__(self, board, x, y, ice, ore, rubble, lichen, lichen_strain):
-        self.board = board
+    __slots__ = ('id', 'x', 'y', 'rubble', 'lichen', 'lichen_strain', 'lichen_connected', 'unit_id',
+                 'assigned_unit_id', 'board', 'ice', 'ore', 'lichen_dist', 'lichen_bottleneck',
+                 'factory_center', 'factory_id', 'flood_temp', 'assigned_factory', '_is_contested',
+                 'flatland_id', 'flatland_size', 'lowland_id', 'lowland_size', 'factory_dists',
+                 'unit_history', '_spawnable', 'neighbor_cells', 'move_cells')
+
+    def __init__(self, board, x, y, ice, ore):
         self.id = y * board.size + x
         self.x = x
         self.y = y
+        # Per-step state lives in board.state planes; these are views indexed by step index.
+        state = board.state
+        self.rubble = CellField(state.rubble, self.id)
+        self.lichen = CellField(state.lichen, self.id)
+        self.lichen_strain = CellField(state.lichen_strain, self.id)
+        self.lichen_connected = CellField(state.lichen_connected, self.id)
+        self.unit_id = CellField(state.unit_id, self.id)
+        self.assigned_unit_id = CellField(state.assigned_unit_id, self.id)
+        self.unit_history = HistoryField(board.strategy.unit_history, self.id)  # unit id by step
+        # Static adjacency, set by Board::from_obs() once all cells exist; see Adjacency
+        self.neighbor_cells = None  # [Cell] in N E S W order
+        self.move_cells = None  # (Cell) indexed by direction; None if off board
+        self.reset(board, ice, ore)
+
+    def reset(self, board, ice, ore):
+        '''Set per-invocation attributes; cells are reused across invocations (see BoardCache)'''
+        self.board = board
         self.ice = ice
         self.ore = ore
-        self.rubble = [rubble] + [0] * C.FUTURE_LEN
-        self.lichen = [lichen] + [0] * C.FUTURE_LEN
-        self.lichen_strain = [lichen_strain] + [-1] * C.FUTURE_LEN
-        self.lichen_connected = [False] + [False] * C.FUTURE_LEN
         self.lichen_dist = None
         self.lichen_bottleneck = None
 
         self.factory_center = False
         self.factory_id = None
 
-        self.dist_temp = (C.UNREACHABLE, C.UNREACHABLE, None, -1)  # Used by Board::dist()
         self.flood_temp = False  # Used by Board::flood_fill()
 
-        self.unit_id = [None] + [None] * C.FUTURE_LEN
-        self.assigned_unit_id = [None] + [None] * C.FUTURE_LEN
-
         self.assigned_factory = None
 
         self._is_contested = None
-        self._light_traffic = None
-        self._heavy_traffic = None
 
         # Cached values
         self.flatland_id = None  # int
@@ -41,7 +55,7 @@ class Cell:
         self.lowland_id = None  # int
         self.lowland_size = 0  # int
         self.factory_dists = None  # {factory_id: dist}
-        self.unit_history = None  # list of unit_ids
+        self._spawnable = None  # set by get_spawn_cells() during early setup
 
     def __repr__(self):
         return f'({self.x},{self.y})'
@@ -69,6 +83,8 @@ class Cell:
             if neighbor.unit_id[i] == unit.id:
                 log(f'{step} [{i}] Warning: {unit} registered at {neighbor} then {self}')
                 assert False
+        if self.unit_id[i] is None:
+            self.board.reservations.reserve(step, self)
         self.unit_id[i] = unit.id
 
     def set_assignment(self, step, unit):
@@ -93,8 +109,8 @@ class Cell:
         self.assigned_unit_id[i] = None
 
     def assigned_unit(self, step):
-        i = step - self.board.step
-        return self.board.unit(self.assigned_unit_id[i])
+        board = self.board
+        return board.unit(board.state.assigned_unit_id[step - board.step][self.id])
 
     def factory(self):
         '''Return reference to factory at cell, or None'''
@@ -106,8 +122,8 @@ class Cell:
         return factory and factory.x != self.x and factory.y != self.y
 
     def unit(self, step, player_id=None):
-        i = step - self.board.step
-        unit = self.board.unit(self.unit_id[i])
+        board = self.board
+        unit = board.unit(board.state.unit_id[step - board.step][self.id])
         if player_id is None:
             return unit
         return unit if unit and unit.player_id == player_id else None
@@ -143,60 +159,43 @@ class Cell:
         route = self.board._route(dest_cell)
         return route[1]
 
+    def neighbor_in(self, direction):
+        return self.move_cells[direction]
+
     def north(self):
-        return self.neighbor(0, -1)
+        return self.move_cells[Direction.NORTH]
 
     def west(self):
-        return self.neighbor(-1, 0)
+        return self.move_cells[Direction.WEST]
 
     def east(self):
-        return self.neighbor(1, 0)
+        return self.move_cells[Direction.EAST]
 
     def south(self):
-        return self.neighbor(0, 1)
+        return self.move_cells[Direction.SOUTH]
 
     def neighbors(self):
-        cells = [self.north(), self.east(), self.south(), self.west()]
-        return [cell for cell in cells if cell]
-
-    def nearest_factory(self, board, player_id=None):  # this stuff needs to move to board
-        if player_id is None:
-            #assert False  # Too easy to get wrong
-            factories = board.player.factories()
-        elif player_id == 'all':
-            factories = board.factories.values()
-        else:
-            factories = [f for f in board.factories.values() if f.player_id == player_id]
+        '''Shared list; do not modify'''
+        return self.neighbor_cells
 
-        nearest_factory, min_dist = None, C.UNREACHABLE
-        for factory in factories:
-            dist = self.man_dist_factory(factory)
-            if dist < min_dist:
-                nearest_factory, min_dist = factory, dist
-        return nearest_factory
+    def nearest_factory(self, board, player_id=None):
+        factory_id = board.factory_map(player_id).nearest_id[self.id]
+        return board.factories[factory_id] if factory_id is not None else None
 
     def nearest_factory_dist(self, board, player_id=None):
-        nearest_factory = self.nearest_factory(board, player_id=player_id)
-        return self.man_dist_factory(nearest_factory) if nearest_factory else C.UNREACHABLE
+        return board.factory_map(player_id).dist[self.id]
 
     def nearest_unit(self, step, board, light=False, heavy=False, player_id=None):
         assert light or heavy
 
+        index = board.spatial_index(step)
         if player_id is None:
-            units = board.player.units()
-        elif player_id == 'all':
-            units = board.units.values()
-        else:
-            units = [u for u in board.units.values() if u.player_id == player_id]
-        units = [u for u in units if ((light and u.type == 'LIGHT') or (heavy and u.type == 'HEAVY'))]
+            units = index.nearest_units(self, board.player.id, light=light, heavy=heavy)
+            return min(units, key=lambda u: u.id) if units else None
 
-        nearest_unit, min_dist = None, C.UNREACHABLE
-        for unit in units:
-            pos_step = step if unit.player_id == board.player.id else board.step
-            dist = self.man_dist(unit.cell(pos_step))
-            if dist < min_dist:
-                nearest_unit, min_dist = unit, dist
-        return nearest_unit
+        # Ties go to the first unit in board.units
+        units = index.nearest_units(self, player_id, light=light, heavy=heavy)
+        return min(units, key=lambda u: index.order[u.id]) if units else None
 
     def is_between(self, cella, cellb):
         return (((cella.x <= self.x <= cellb.x)
@@ -237,6 +236,14 @@ class Cell:
 
     def moves_available(self, step, power):
         i = step - self.board.step
+
+        # With enough power for any rubble, this is just a count of open cells
+        if power >= 1 + math.floor(self.board.env_cfg.MAX_RUBBLE * 0.05):
+            count = self.board.reservations.open_moves(step, self)
+            if not self.unit(step + 1) and not self.board.reservations.blocked[self.id]:
+                count += 1
+            return count
+
         count = 0
         for neighbor in [self] + self.neighbors():
             if (not neighbor.unit(step + 1)
@@ -303,39 +310,49 @@ class Cell:
             and unit_at_dest is not unit
             and unit_at_dest.x[i+1] is None):
             # We need to confirm that it has sufficient power to move this step.
-            move_costs = []
-            for direction in range(Direction.MIN, Direction.MAX + 1):
-                # Check valid moves for unit_at_dest
-                if (direction == Direction.CENTER
-                    or (direction == Direction.NORTH and self.y == 0)
-                    or (direction == Direction.WEST and self.x == 0)
-                    or (direction == Direction.EAST and self.x == self.board.size - 1)
-                    or (direction == Direction.SOUTH and self.y == self.board.size - 1)):
-                    continue
-                # Avoid opp factories and pre-claimed cells
-                move_cell = self.neighbor(*C.MOVE_DELTAS[direction])
-                if (move_cell.unit(step + 1)
-                    or (move_cell.factory() and move_cell.factory().player_id != unit.player_id)):
-                    continue
-                move_cost, _, _ = unit_at_dest.move_cost(step, direction)
-                if move_cost == 'rma':
-                    # TODO debug logging
-                    # TODO: If we never figure this out, just continue here in this case
-                    log(f'CrashB: {i}={step}-{self.board.step}')
-                    log(f'{unit} {unit.cell(step)} -> {self}')
-                    log(f'{unit_at_dest} {direction} {move_costs} {move_cell}')
-                    log(f'{unit_at_dest.cell(step)}')
-                    log(f'{[(x if x is not None else -9) for x in self.unit_id]}')
-                    log(f'{[(x if x is not None else -9) for x in unit_at_dest.y]}')
-                    log(f'{[(x if x is not None else -9) for x in unit_at_dest.x]}')
-                    log(f'{unit_at_dest.role}')
-                    log(f'{unit.role}')
-                    assert False
-                move_costs.append(move_cost)
-            # This move is not safe if unit_at_dest has nowhere to go.
-            if (len(move_costs) == 0
-                or unit_at_dest.power[i] < min(move_costs)):
+            # The reservation table counts its open moves. Per-direction costs are only needed if
+            # it might not be able to afford moving onto rubble.
+            counted = (unit.player_id == board.player.id)
+            if counted and board.reservations.open_moves(step, self) == 0:
                 return False
+            cfg = unit_at_dest.cfg
+            max_move_cost = (math.floor(cfg.MOVE_COST
+                                        + cfg.RUBBLE_MOVEMENT_COST * board.env_cfg.MAX_RUBBLE)
+                             + cfg.ACTION_QUEUE_POWER_COST)
+            if not counted or unit_at_dest.power[i] < max_move_cost:
+                move_costs = []
+                for direction in range(Direction.MIN, Direction.MAX + 1):
+                    # Check valid moves for unit_at_dest
+                    if (direction == Direction.CENTER
+                        or (direction == Direction.NORTH and self.y == 0)
+                        or (direction == Direction.WEST and self.x == 0)
+                        or (direction == Direction.EAST and self.x == self.board.size - 1)
+                        or (direction == Direction.SOUTH and self.y == self.board.size - 1)):
+                        continue
+                    # Avoid opp factories and pre-claimed cells
+                    move_cell = self.neighbor_in(direction)
+                    if (move_cell.unit(step + 1)
+                        or (move_cell.factory() and move_cell.factory().player_id != unit.player_id)):
+                        continue
+                    move_cost, _, _ = unit_at_dest.move_cost(step, direction)
+                    if move_cost == 'rma':
+                        # TODO debug logging
+                        # TODO: If we never figure this out, just continue here in this case
+                        log(f'CrashB: {i}={step}-{self.board.step}')
+                        log(f'{unit} {unit.cell(step)} -> {self}')
+                        log(f'{unit_at_dest} {direction} {move_costs} {move_cell}')
+                        log(f'{unit_at_dest.cell(step)}')
+                        log(f'{[(x if x is not None else -9) for x in self.unit_id]}')
+                        log(f'{[(x if x is not None else -9) for x in unit_at_dest.y]}')
+                        log(f'{[(x if x is not None else -9) for x in unit_at_dest.x]}')
+                        log(f'{unit_at_dest.role}')
+                        log(f'{unit.role}')
+                        assert False
+                    move_costs.append(move_cost)
+                # This move is not safe if unit_at_dest has nowhere to go.
+                if (len(move_costs) == 0
+                    or unit_at_dest.power[i] < min(move_costs)):
+                    return False
 
         # Need to check if this move dest is a potential escape route for another unit
         # Does a neighbor cell have a unit with no other move?
@@ -369,16 +386,6 @@ class Cell:
         for factory_id, factory in self.board.factories.items():
             self.factory_dists[factory_id] = self.man_dist_factory(factory)
 
-    def set_unit_history(self, strategy):
-        assert self.unit_history is None
-
-        if (self.id in strategy.cell_caches
-            and strategy.cell_caches[self.id].unit_history is not None):
-            self.unit_history = strategy.cell_caches[self.id].unit_history
-            return
-
-        self.unit_history = [None] * 1000
-
     def is_contested(self):
         if self._is_contested is not None:
             return self._is_contested
@@ -410,25 +417,9 @@ class Cell:
 
     def traffic(self):
         '''Returns value [0.0, 1.0] representing percentage of recent time with opp unit here'''
-        if self._light_traffic is not None:
-            return self._light_traffic, self._heavy_traffic
-
-        LEN = 50
-        board = self.board
-        step = board.step
-
-        self._light_traffic, self._heavy_traffic = 0, 0
-        for s in range(step, max(-1,step-LEN), -1):
-            uid = self.unit_history[s]
-            if uid in board.units and board.units[uid].player_id == board.opp.id:
-                if board.units[uid].type == 'HEAVY':
-                    self._heavy_traffic += 1
-                else:
-                    self._light_traffic += 1
-
-        self._light_traffic /= LEN
-        self._heavy_traffic /= LEN
-        return self._light_traffic, self._heavy_traffic
+        history = self.board.strategy.unit_history
+        return (history.light_traffic[self.id] / history.TRAFFIC_LEN,
+                history.heavy_traffic[self.id] / history.TRAFFIC_LEN)
 
     # Is self vulnerable to the cell at other_factory?
     def ice_vulnerable_relative(self, step, other_factory):
@@ -1,5 +1,6 @@
 import sys
 
+from .board_state import timeline_tails
 from .mode_forge import ModeForge
 from .role_antagonizer import RoleAntagonizer
 from .role_attacker import RoleAttacker
@@ -17,25 +18,120 @@ from .role_water_transporter import RoleWaterTransporter
 from .util import C, Action, Direction, FactoryAction, Resource, log, prandom
 
 
+# Entities each phase can act on: a role NAME, '*' for any unit or 'FACTORY'; see EntityGroup.
+# The Entity::do_*() methods still check everything themselves, this only skips entities that
+# would return None right away. Phases not listed here visit every entity.
+PHASE_ROLES = {
+    'do_forge_build': 'FACTORY', 'do_factory_build': 'FACTORY', 'do_factory_water': 'FACTORY',
+    'do_factory_end_phase_water': 'FACTORY', 'do_factory_none': 'FACTORY',
+    'do_no_move': '*', 'do_no_move_dig_repair': '*', 'do_move_step998': '*',
+    'do_move_step999': '*', 'do_dig_step999': '*', 'do_move_win_collision': '*',
+    'do_pickup_resource_from_exploding_factory': '*',
+    'do_blockade_move': 'blockade', 'do_blockade_pickup': 'blockade',
+    'do_blockade_transfer': 'blockade',
+    'do_miner_move': 'miner', 'do_miner_pickup': 'miner', 'do_miner_transfer': 'miner',
+    'do_miner_dig': 'miner', 'do_protected_miner_dig': 'miner',
+    'do_protected_miner_transfer': 'miner', 'do_protected_miner_pickup': 'miner',
+    'do_protected_miner_move': 'miner',
+    'do_antagonizer_move': 'antagonizer', 'do_antagonizer_dig': 'antagonizer',
+    'do_antagonizer_pickup': 'antagonizer', 'do_antagonizer_transfer': 'antagonizer',
+    'do_attacker_move': 'attacker', 'do_attacker_pickup': 'attacker',
+    'do_attacker_transfer': 'attacker',
+    'do_sidekick_move': 'sidekick',
+    'do_cow_move': 'cow', 'do_cow_pickup': 'cow', 'do_cow_transfer': 'cow', 'do_cow_dig': 'cow',
+    'do_pillager_move': 'pillager', 'do_pillager_pickup': 'pillager',
+    'do_pillager_transfer': 'pillager', 'do_pillager_dig': 'pillager',
+    'do_generator_move': 'generator', 'do_generator_dig': 'generator',
+    'do_generator_transfer': 'generator',
+    'do_transporter_move': 'transporter', 'do_transporter_pickup_for_ice': 'transporter',
+    'do_transporter_pickup': 'transporter', 'do_transporter_transfer': 'transporter',
+    'do_protector_move': 'protector', 'do_protector_pickup': 'protector',
+    'do_protector_transfer': 'protector',
+    'do_recharge_move': 'recharge', 'do_recharge_transfer': 'recharge',
+    'do_relocate_move': 'relocate', 'do_relocate_pickup': 'relocate',
+    'do_relocate_transfer': 'relocate',
+    'do_water_transporter_move': 'water_transporter',
+    'do_water_transporter_move_emergency': 'water_transporter',
+    'do_water_transporter_pickup': 'water_transporter',
+    'do_water_transporter_transfer': 'water_transporter',
+}
+
+
 class EntityGroup:
+    '''Runs action phases (group.do_*()) over entities that have not acted yet this step.
+
+    Entities are bucketed by (role NAME, type) so a phase only visits those PHASE_ROLES allows.
+    Buckets are rebuilt whenever board.unit_version changes (a role was set/unset), including
+    partway through a phase, so visiting order and results match a scan of every entity.
+    '''
     def __init__(self, step, step_idx, entities):
         self.step = step
         self.step_idx = step_idx
         self.entities = entities
+        self.board = entities[0].board if entities else None
+        self._buckets = None  # {(role NAME, type): [(index, Entity)]}
+        self._buckets_version = None  # board.unit_version that _buckets was built for
+        for e in entities:
+            e.action = None
 
     def __getattr__(self, attr):
-        if attr not in self.__dict__:
-            def func(*args, **kwargs):
-                count = 0
-                for e in self.entities:
-                    if e.last_action_step < self.step:
-                        e.action = getattr(e, attr)(self.step, *args, **kwargs)
-                        if e.action is not None:
-                            e.last_action_step = self.step
-                            count += 1
-                return count
-            return func
-        return super().__getattr__(attr)
+        if not attr.startswith('do_'):
+            raise AttributeError(attr)
+
+        def func(*args, **kwargs):
+            return self._run_phase(attr, args, kwargs)
+        return func
+
+    def _run_phase(self, phase, args, kwargs):
+        step, board = self.step, self.board
+        visited, count = 0, 0
+        pos = -1  # index in self.entities of the last entity considered
+        done = False
+        while not done:
+            done = True
+            version = board.unit_version if board else None
+            for k, e in self._eligible(phase, kwargs.get('heavy'), pos):
+                pos = k
+                if e.last_action_step < step:
+                    visited += 1
+                    e.action = getattr(e, phase)(step, *args, **kwargs)
+                    if e.action is not None:
+                        e.last_action_step = step
+                        count += 1
+                if board and board.unit_version != version:
+                    done = False  # roles changed; re-bucket the remaining entities
+                    break
+
+        if C.PHASE_STATS and board:
+            stats = board.phase_stats.setdefault(phase, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += visited
+            stats[2] += count
+        return count
+
+    def _eligible(self, phase, heavy, pos):
+        '''Return [(index, Entity)] after index pos that phase could act on, in entity order'''
+        role_name = PHASE_ROLES.get(phase)
+        if role_name is None or not self.entities:
+            return list(enumerate(self.entities))[pos+1:]
+
+        if self._buckets is None or self._buckets_version != self.board.unit_version:
+            self._buckets, self._buckets_version = {}, self.board.unit_version
+            for k, e in enumerate(self.entities):
+                if e.type == 'FACTORY':
+                    key = ('FACTORY', 'FACTORY')
+                else:
+                    key = (e.role.NAME if e.role else None, e.type)
+                self._buckets.setdefault(key, []).append((k, e))
+
+        if role_name == 'FACTORY':
+            types = ('FACTORY',)
+        else:
+            types = ('LIGHT', 'HEAVY') if heavy is None else ('HEAVY',) if heavy else ('LIGHT',)
+        buckets = [bucket for (name, entity_type), bucket in self._buckets.items()
+                   if entity_type in types and (role_name == '*' or role_name == name)]
+        entities = buckets[0] if len(buckets) == 1 else sorted(x for b in buckets for x in b)
+        return [x for x in entities if x[0] > pos] if pos >= 0 else entities
 
     def finalize(self):
         for e in self.entities:
@@ -57,11 +153,13 @@ class EntityGroup:
                 e.new_action_queue[self.step_idx] = e.action
 
 class Entity:
+    __slots__ = ('action', 'last_action_step', 'assigned_unit_id', '_lie_step')
+
     def __init__(self):
         self.action = None
         self.last_action_step = -1
 
-        self.assigned_unit_id = [None] + [None] * C.FUTURE_LEN
+        self.assigned_unit_id = [None] + timeline_tails()[1]
         self._lie_step = None
 
     def set_lie_step(self, step):
@@ -899,7 +997,7 @@ class Entity:
                     continue
 
                 direction = opp_unit.action_queue[0][1]
-                opp_move_cell = neighbor.neighbor(*C.MOVE_DELTAS[direction])
+                opp_move_cell = neighbor.neighbor_in(direction)
                 if opp_move_cell is move_cell:
                     # Ignore power gain and move cost, as these would be the same
                     my_power = self.power[i] - self.cfg.ACTION_QUEUE_POWER_COST
@@ -1,6 +1,7 @@
 import math
 import sys
 
+from .board_state import timeline_tails
 from .cell import Cell
 from .entity import Entity
 from .unit import Unit
@@ -8,6 +9,15 @@ from .util import C, Direction, FactoryAction, log, profileit
 
 
 class Factory(Entity):
+    __slots__ = ('board', 'id', 'id_str', 'player_id', 'x', 'y', 'ice', 'ore', 'water', 'metal',
+                 'power', 'type', 'new_action', '_units', 'mode', 'lichen_count',
+                 'lichen_connected_cells', 'lichen_growth_cells', 'lichen_flat_boundary_cells',
+                 'lichen_rubble_boundary_cells', 'lichen_frontier_cells',
+                 'lichen_opp_boundary_cells', 'lichen_bottleneck_cells', 'resource_routes',
+                 'lowland_routes', 'factory_routes', '_power_gain', '_power_usage',
+                 '_ice_vuln_relative', '_ice_vuln_covered', '_members_key', '_members',
+                 '_member_counts')
+
     def __init__(self, board, factory_id, player_id, x, y,
                  ice, ore, water, metal, power):
         super().__init__()
@@ -17,18 +27,19 @@ class Factory(Entity):
         self.player_id = player_id
         self.x = x
         self.y = y
-        self.ice = [ice] + [0] * C.FUTURE_LEN
-        self.ore = [ore] + [0] * C.FUTURE_LEN
-        self.water = [water] + [0] * C.FUTURE_LEN
-        self.metal = [metal] + [0] * C.FUTURE_LEN
-        self.power = [power] + [0] * C.FUTURE_LEN
+        zeros, nones, _ = timeline_tails()
+        self.ice = [ice] + zeros
+        self.ore = [ore] + zeros
+        self.water = [water] + zeros
+        self.metal = [metal] + zeros
+        self.power = [power] + zeros
         self.type = 'FACTORY'
         self.new_action = None
         self._units = [[]] + [[] for _ in range(C.FUTURE_LEN)]
 
         self.mode = None
 
-        self.lichen_count = [None] + [None] * C.FUTURE_LEN
+        self.lichen_count = [None] + nones
         self.lichen_connected_cells = None
         self.lichen_growth_cells = None
         self.lichen_flat_boundary_cells = None
@@ -41,6 +52,14 @@ class Factory(Entity):
         self.lowland_routes = None  # list of list of Cells
         self.factory_routes = None  # list of list of Cells
 
+        self._power_gain = None  # set by Board::begin_step_simulation()
+        self._power_usage = None  # set by Board::begin_step_simulation()
+        self._ice_vuln_relative = None  # set by agent_early_setup()
+        self._ice_vuln_covered = None  # set by agent_early_setup()
+        self._members_key = None  # (step, board.unit_version, unit count) that _members is for
+        self._members = None  # (Unit), see .units()
+        self._member_counts = None  # {(type, role name): count}, see .unit_count()
+
     def __repr__(self):
         return f'Factory{self.id}'
 
@@ -70,6 +89,8 @@ class Factory(Entity):
 
     def calculate_lichen_count(self, step):
         i = step - self.board.step
+        state = self.board.state
+        rubble, lichen, lichen_strain = state.rubble[i], state.lichen[i], state.lichen_strain[i]
 
         self.lichen_connected_cells = []  # cells with lichen
         self.lichen_growth_cells = []  # connected + this step's new lichen cells
@@ -79,16 +100,16 @@ class Factory(Entity):
         self.lichen_opp_boundary_cells = set()  # adjacent to connected/boundary w/ opp lichen
 
         def lichen_growth_cond(cell):
-            if cell.factory_id == self.id or cell.lichen_strain[i] == self.id:
+            if cell.factory_id == self.id or lichen_strain[cell.id] == self.id:
                 return True
             if cell.factory():  # Other factory
                 return False
-            if cell.lichen[i] == 0 and not cell.ice and not cell.ore:
+            if lichen[cell.id] == 0 and not cell.ice and not cell.ore:
                 # Check cell neighbors for boundary conditions
                 # Not worth continuing if this cell cannot grow lichen
                 cell_is_boundary = False
                 for neighbor in cell.neighbors():
-                    if neighbor.lichen_strain[i] not in (-1, self.id):
+                    if lichen_strain[neighbor.id] not in (-1, self.id):
                         self.lichen_opp_boundary_cells.add(neighbor)
                         cell_is_boundary = True
                     if neighbor.factory_id not in (None, self.id):
@@ -97,10 +118,10 @@ class Factory(Entity):
                     return False
 
                 factory_dist = cell.man_dist_factory(self)
-                max_adj_lichen = max([0] + [n.lichen[i]
+                max_adj_lichen = max([0] + [lichen[n.id]
                                             for n in cell.neighbors()
-                                            if n.lichen_strain[i] == self.id])
-                if cell.rubble[i] > 0:
+                                            if lichen_strain[n.id] == self.id])
+                if rubble[cell.id] > 0:
                     # Rubble adjacent to factory/lichen>0
                     if factory_dist == 1 or max_adj_lichen > 0:
                         self.lichen_rubble_boundary_cells.append(cell)
@@ -112,7 +133,7 @@ class Factory(Entity):
                     # Identify neighbors with lichen (the frontier; good for pillaging/defending)
                     if max_adj_lichen > 0:
                         for neighbor in cell.neighbors():
-                            if neighbor.lichen_strain[i] == self.id and neighbor.lichen[i] > 0:
+                            if lichen_strain[neighbor.id] == self.id and lichen[neighbor.id] > 0:
                                 self.lichen_frontier_cells.append(neighbor)
 
                     # Flatland adjacent to factory/lichen>19
@@ -124,9 +145,9 @@ class Factory(Entity):
             if cell.factory():
                 return
             self.lichen_growth_cells.append(cell)
-            if cell.lichen[i] > 0:
+            if lichen[cell.id] > 0:
                 self.lichen_connected_cells.append(cell)
-                cell.lichen_connected[i] = True
+                state.lichen_connected[i][cell.id] = True
 
         self.board.flood_fill(self.cell(), lichen_growth_cond, lichen_cell_fn)
         self.lichen_count[i] = len(self.lichen_connected_cells)
@@ -139,14 +160,13 @@ class Factory(Entity):
         if not self.lichen_connected_cells:
             return
 
-        self.board.dist(
+        field = self.board.dist_field(
             step, self.cells(), None,
-            dest_cond=lambda s,c: False,
             avoid_cond=lambda s,c: (c.lichen_strain[i] != self.id),
             unit_move_cost=1, unit_rubble_movement_cost=0)
 
         for cell in self.cells() + self.lichen_connected_cells:
-            cell.lichen_dist = cell.dist_temp[0]
+            cell.lichen_dist = field.cost[cell.id]
 
         # Identify lichen bottlenecks
         for cell in self.lichen_connected_cells:
@@ -200,6 +220,34 @@ class Factory(Entity):
             self._units[i].remove(unit.id)
 
     def units(self, step):
+        '''Return units belonging to this factory at step, as a tuple sorted by id.
+
+        Membership only changes with unit role/factory assignments and new units (which bump
+        board.unit_version or the unit count), so the result is cached until then.
+        '''
+        board = self.board
+        key = (step, board.unit_version, len(board.units))
+        if key != self._members_key:
+            self._members_key = key
+            self._members = tuple(self._get_units(step))
+            self._member_counts = None
+        return self._members
+
+    def unit_count(self, step, unit_type=None, role_name=None):
+        '''Return the number of .units(step) of unit_type (if given) with role role_name (if given)'''
+        members = self.units(step)
+        if self._member_counts is None:
+            counts = {}
+            for unit in members:
+                keys = [(unit.type, None), (None, None)]
+                if unit.role:
+                    keys += [(unit.type, unit.role.NAME), (None, unit.role.NAME)]
+                for key in keys:
+                    counts[key] = counts.get(key, 0) + 1
+            self._member_counts = counts
+        return self._member_counts.get((unit_type, role_name), 0)
+
+    def _get_units(self, step):
         board = self.board
 
         # For opp factories use stats.last_factory_id
@@ -540,33 +588,28 @@ class Factory(Entity):
                 if len(lowland_cells) == 10:
                     break
 
-        avoid_ice_factory_cond = lambda _,c: (
-            c.factory()
-            or (self.player_id == self.board.player.id
-                and (c.ice
-                     or any(n for n in c.neighbors()
-                            if n.factory() and n.factory().player_id != self.player_id))))
-
-        avoid_ice_ore_factory_cond = lambda _,c: (
-            c.factory()
-            or (self.player_id == self.board.player.id
-                and (c.ice
-                     or c.ore
-                     or any(n for n in c.neighbors()
-                            if n.factory() and n.factory().player_id != self.player_id))))
+        avoid_ice_factory_mask = self.board.avoid_mask('factory_ice', player_id=self.player_id)
+        avoid_ice_ore_factory_mask = self.board.avoid_mask('factory_ice_ore', player_id=self.player_id)
 
         for resource_cell, man_dist in resource_cells:
             # Consider rubble a bit more for ore, which may be further / less traveled
+            # Not a DistField: A* toward resource_cell breaks ties between equal routes differently
             costs = 50,1 if resource_cell.ore else 100,1
             route = self.board.route(
                 self.board.step, self.cells(), None,
                 dest_cell=resource_cell,
-                avoid_cond=avoid_ice_factory_cond,
+                avoid_mask=avoid_ice_factory_mask,
                 unit_move_cost=costs[0], unit_rubble_movement_cost=costs[1])
             if route:
                 self.resource_routes.append(route)
         self.resource_routes.sort(key=lambda r: len(r))
 
+        lowland_field = self.board.dist_field(
+            self.board.step, self.cells(), None,
+            avoid_mask=avoid_ice_ore_factory_mask,
+            avoid_key=('factory_ice_ore', self.player_id),
+            unit_move_cost=100, unit_rubble_movement_cost=1)
+
         lowlands_checked = set([None])
         destinations_checked = set()
         for lowland_cell, man_dist in lowland_cells:
@@ -577,11 +620,9 @@ class Factory(Entity):
 
                 # TODO: src=self.cells()+self.lichen_connected_cells
                 #       This needs to be called after lichen update
-                route = self.board.route(
-                    self.board.step, self.cells(), None,
-                    dest_cond=lambda _,c: (c.lowland_id == region_id or c.flatland_id == region_id),
-                    avoid_cond=avoid_ice_ore_factory_cond,
-                    unit_move_cost=100, unit_rubble_movement_cost=1)
+                _, _, dest_cell = lowland_field.query(
+                    lambda _,c: (c.lowland_id == region_id or c.flatland_id == region_id))
+                route = lowland_field.route(dest_cell)
                 if route and route[-1] not in destinations_checked:
                     destinations_checked.add(route[-1])
                     self.lowland_routes.append(route)
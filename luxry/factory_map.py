@@ -0,0 +1,28 @@
+from .util import C
+
+
+class FactoryMap:
+    '''Nearest factory for every cell, over one ordered list of factories.
+
+    nearest_id[cell_id]: id of the factory with the lowest Cell::man_dist_factory(); ties go to
+                         the earliest factory in the list, as in Cell::nearest_factory()
+    dist[cell_id]: that distance, or C.UNREACHABLE if there are no factories
+    Factories never move, so a map stays valid until the factory set changes (see
+    Board::factory_map()).
+    '''
+    def __init__(self, size, factories):
+        self.factory_ids = tuple(f.id for f in factories)
+        self.nearest_id = [None] * (size * size)
+        self.dist = [C.UNREACHABLE] * (size * size)
+
+        nearest_id, dist = self.nearest_id, self.dist
+        for factory in factories:
+            dxs = [max(0, abs(x - factory.x) - 1) for x in range(size)]
+            for y in range(size):
+                dy = max(0, abs(y - factory.y) - 1)
+                row = y * size
+                for x in range(size):
+                    d = dxs[x] + dy
+                    if d < dist[row + x]:
+                        dist[row + x] = d
+                        nearest_id[row + x] = factory.id
@@ -5,6 +5,8 @@ from .util import C, log, prandom, serialize_obj, deserialize_obj
 
 
 class Mode:
+    __slots__ = ('factory', 'set_mode_step')
+
     def __init__(self, step, factory):
         self.factory = factory
 
@@ -53,12 +55,11 @@ class Mode:
         # TODO: increase if opp's light:heavy ratio is very high?
         light_lim = C.LIGHT_LIM + (step // 100)
 
-        light_count = len([u for u in self.factory.units(step)
-                           if u.type == 'LIGHT' and (not u.role or u.role.NAME != 'relocate')])
-        heavy_count = len([u for u in self.factory.units(step)
-                           if (u.type == 'HEAVY'
-                               and (not u.role
-                                    or (u.role.NAME != 'relocate' and u.role.NAME != 'generator')))])
+        light_count = (self.factory.unit_count(step, 'LIGHT')
+                       - self.factory.unit_count(step, 'LIGHT', 'relocate'))
+        heavy_count = (self.factory.unit_count(step, 'HEAVY')
+                       - self.factory.unit_count(step, 'HEAVY', 'relocate')
+                       - self.factory.unit_count(step, 'HEAVY', 'generator'))
 
         # TODO evaluating different conditional(s)
         # TODO: need to make this agree with ore_digs in RoleMiner::transition and RoleMiner::is_valid
@@ -20,6 +20,8 @@ class ModeDefault(Mode):
     '''Default factory behavior'''
     NAME = 'default'
 
+    __slots__ = ()
+
     def __init__(self, step, factory):
         super().__init__(step, factory)
 
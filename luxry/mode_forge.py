@@ -20,6 +20,8 @@ class ModeForge(ModeDefault):
 
     MAX_ORE_DIST = 3
 
+    __slots__ = ('ore_cell',)
+
     def __init__(self, step, factory, ore_cell):
         super().__init__(step, factory)
         self.ore_cell = ore_cell
@@ -74,8 +76,7 @@ class ModeForge(ModeDefault):
                 return
 
             # If we already have a bunch of lights, no need
-            lights = [u for u in factory.units(step) if u.type == 'LIGHT']
-            if len(lights) >= C.LIGHT_LIM - 2:
+            if factory.unit_count(step, 'LIGHT') >= C.LIGHT_LIM - 2:
                 return
 
         # Verify that no opp factory has ice superiority over this one
@@ -178,7 +179,7 @@ class ModeForge(ModeDefault):
             # This is called before any role is validated/set, so we can just set roles to None
             for unit in self.factory.units(step):
                 if not (unit.type == 'LIGHT' and unit.role and unit.role.NAME == 'relocate'):
-                    unit.role = None
+                    unit.clear_role()
 
         return valid
 
@@ -28,6 +28,8 @@ class ModeIceConflict(ModeDefault):
     '''
     NAME = 'ice_conflict'
 
+    __slots__ = ('opp_factory', 'defensive')
+
     def __init__(self, step, factory, opp_factory, defensive=False):
         super().__init__(step, factory)
         self.opp_factory = opp_factory
@@ -119,7 +121,7 @@ class ModeIceConflict(ModeDefault):
             # Force existing units to stop what they're doing
             # This is called before any role is validated/set, so we can just set roles to None
             for unit in factory.units(step):
-                unit.role = None
+                unit.clear_role()
             return ModeIceConflict.from_desperation(
                 step, factory, attacking_factory=opp_factory)
 
@@ -236,7 +238,7 @@ class ModeIceConflict(ModeDefault):
             for unit in self.factory.units(step):
                 # Let any active water transporter finish their delivery.
                 if not unit.role or unit.role.NAME != 'water_transporter':
-                    unit.role = None
+                    unit.clear_role()
 
             # Ensure that at least one ice cell is assigned to this factory
             # If not, take the nearest one from a factory with more than 1
@@ -266,7 +268,7 @@ class ModeIceConflict(ModeDefault):
         heavy_ants = [u for u in self.factory.units(step)
                       if u.type == 'HEAVY' and u.role and u.role.NAME == 'antagonizer']
         heavy_ant_target_cell = heavy_ants[0].role.target_cell if heavy_ants else None
-        light_count= len([u for u in self.factory.units(step) if u.type == 'LIGHT'])
+        light_count = self.factory.unit_count(step, 'LIGHT')
 
         if unit.type == 'HEAVY':
             new_role = (
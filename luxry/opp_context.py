@@ -0,0 +1,75 @@
+class OppContext:
+    '''Opponent facts that hold for every simulated step of a turn.
+
+    Opp units are not simulated: their positions, power and action queues stay as of board.step,
+    and unit history is only recorded before the first step index. So anything derived from them
+    alone can be computed once per turn and shared by all step indexes. Built by
+    Board::begin_step_simulation() at the first step index; see Board::opp_context.
+
+    mines(heavy, ice): opp mine cells, as returned by Board::opp_mines()
+    chain_units: opp units that are part of a chain (see Unit::is_chain()), by id
+    low_power_units[type]: opp units with low_power set, by id (see set_low_power_units())
+    neighbor_units(cell): [(neighbor, unit)] for units at board.step on cell and its neighbors
+    threat_units(cell, ..): recent opp units near cell, as Role::_get_threat_units()
+    '''
+    def __init__(self, board):
+        self.board = board
+
+        all_mines = set()
+        for unit in board.opp.units():
+            for unit_mine in unit.get_mines():
+                all_mines.add((unit_mine, unit))
+        self._all_mines = list(all_mines)
+        self._mines = {}  # {(heavy, ice): [cell]}
+
+        self.chain_units = [u for u in board.opp.units() if u.is_chain()]
+        self.low_power_units = {'LIGHT': [], 'HEAVY': []}
+
+        self._neighbor_units = [None] * (board.size * board.size)
+        self._threat_units = {}  # {(cell, history_len, max_radius, heavy, light): [unit]}
+
+    def mines(self, heavy=None, ice=None):
+        key = (heavy, ice)
+        if key not in self._mines:
+            self._mines[key] = [
+                cell for cell, unit in self._all_mines
+                if ((heavy is None or heavy == (unit.type == 'HEAVY'))
+                    and (ice is None or (ice and cell.ice) or (not ice and cell.ore)))]
+        return self._mines[key]
+
+    def set_low_power_units(self):
+        '''Called once opp low_power flags are set (first step index only)'''
+        for unit_type, units in self.low_power_units.items():
+            units[:] = [u for u in self.board.opp.units(unit_type) if u.low_power]
+
+    def neighbor_units(self, cell):
+        entries = self._neighbor_units[cell.id]
+        if entries is None:
+            step = self.board.step
+            entries = []
+            for neighbor in [cell] + cell.neighbors():
+                unit = neighbor.unit(step)
+                if unit:
+                    entries.append((neighbor, unit))
+            self._neighbor_units[cell.id] = entries
+        return entries
+
+    def threat_units(self, cell, history_len, max_radius, heavy, light):
+        key = (cell, history_len, max_radius, heavy, light)
+        if key in self._threat_units:
+            return list(self._threat_units[key])
+
+        board = self.board
+        opp_units = []
+        for radius_cell, _ in cell.radius_cells(min_radius=0, max_radius=max_radius):
+            for j in range(board.step, max(-1, board.step - history_len), -1):
+                uid = radius_cell.unit_history[j]
+                if uid in board.units:
+                    unit = board.units[uid]
+                    if not ((heavy and unit.type == 'HEAVY') or (light and unit.type == 'LIGHT')):
+                        continue
+                    if unit.player_id == board.player.id:
+                        continue
+                    opp_units.append(unit)
+        self._threat_units[key] = opp_units
+        return list(opp_units)
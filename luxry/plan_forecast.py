@@ -0,0 +1,82 @@
+class PlanForecast:
+    '''Last turn's simulated state for this turn, to tell which plans can carry over.
+
+    .record() saves step index 1 (own unit state and cell planes) at the end of the first simulated
+    step; .compare() diffs it with the next observation. A unit's plan is reusable if its own state
+    was predicted exactly and no cell within RADIUS of it diverged (rubble, lichen, strain, or an
+    opp unit arriving/leaving). Persisted in Strategy.
+
+    This only measures how much a partial re-plan could save; every unit is still re-planned.
+    '''
+    RADIUS = 2
+
+    def __init__(self):
+        self.step = None  # board step that was forecast
+        self.units = {}  # {unit_id: (x, y, power, ice, ore, water, metal)}
+        self.rubble, self.lichen, self.lichen_strain = None, None, None
+        self.reusable_unit_ids = set()  # own units whose forecast matched the observation
+        self.stats = None  # (reusable, state diverged, nearby diverged, units, matched cells, cells)
+
+    def record(self, board):
+        '''Save step index 1 of the simulation; call after it has been carried forward'''
+        self.step = board.step + 1
+        self.units = {unit.id: unit_state(unit, 1) for unit in board.player.units()
+                      if unit.id < 900000 and unit.x[1] is not None}
+        state = board.state
+        self.rubble, self.lichen = state.rubble[1][:], state.lichen[1][:]
+        self.lichen_strain = state.lichen_strain[1][:]
+
+    def compare(self, board, history):
+        '''Diff the forecast for board.step with the observation and set reusable_unit_ids'''
+        self.reusable_unit_ids = set()
+        self.stats = None
+        if self.step != board.step:
+            return
+
+        # Cells whose state differs, or whose occupant changed and was/is not an own unit
+        state = board.state
+        n = board.size * board.size
+        diverged = [r != r0 or l != l0 or s != s0
+                    for r, r0, l, l0, s, s0 in zip(self.rubble, state.rubble[0],
+                                                   self.lichen, state.lichen[0],
+                                                   self.lichen_strain, state.lichen_strain[0])]
+        prev_plane, plane = history.planes[board.step - 1], history.planes[board.step]
+        if prev_plane is not None:
+            player_unit_ids = {unit.id for unit in board.player.units()}
+            for k in range(n):
+                prev_uid, uid = prev_plane[k], plane[k]
+                if (prev_uid != uid
+                    and ((prev_uid >= 0 and prev_uid not in player_unit_ids)
+                         or (uid >= 0 and uid not in player_unit_ids))):
+                    diverged[k] = True
+
+        # Units built this turn count as neither reusable nor diverged
+        units = board.player.units()
+        state_diverged, nearby_diverged = 0, 0
+        for unit in units:
+            if unit.id not in self.units:
+                continue
+            if self.units[unit.id] != unit_state(unit, 0):
+                state_diverged += 1
+                continue
+            cell = unit.cell(board.step)
+            if any(diverged[c.id]
+                   for c, _ in cell.radius_cells(min_radius=0, max_radius=self.RADIUS)):
+                nearby_diverged += 1
+            else:
+                self.reusable_unit_ids.add(unit.id)
+        self.stats = (len(self.reusable_unit_ids), state_diverged, nearby_diverged, len(units),
+                      n - sum(diverged), n)
+
+    def summary(self):
+        if self.stats is None:
+            return 'plan reuse: no forecast for this step'
+        reusable, state_diverged, nearby_diverged, units, cells_matched, cells = self.stats
+        return (f'plan reuse: {reusable}/{units} units '
+                f'({state_diverged} state, {nearby_diverged} nearby diverged), '
+                f'{round(100 * cells_matched / cells, 1)}% of cells as forecast')
+
+
+def unit_state(unit, i):
+    return (unit.x[i], unit.y[i], unit.power[i],
+            unit.ice[i], unit.ore[i], unit.water[i], unit.metal[i])
@@ -4,6 +4,9 @@ from .util import log
 
 
 class Player:
+    __slots__ = ('board', 'id', 'water', 'metal', 'strains', 'lichen_disconnected_cells',
+                 '_factories', '_factories_count', '_units', '_units_by_type', '_units_count')
+
     def __init__(self, board, player_id, water, metal, factory_strains):
         self.board = board
         self.id = 0 if (player_id == 0 or player_id == 'player_0') else 1
@@ -12,10 +15,28 @@ class Player:
         self.strains = set(factory_strains)
         self.lichen_disconnected_cells = None
 
+        # Sorted views, rebuilt when an entity is added to the board (they are never removed)
+        self._factories = None  # (Factory)
+        self._factories_count = None  # len(board.factories) when _factories was built
+        self._units = None  # (Unit)
+        self._units_by_type = None  # {type: (Unit)}
+        self._units_count = None  # len(board.units) when _units was built
+
     def factories(self):
-        factories = [x for x in self.board.factories.values() if x.player_id == self.id]
-        return sorted(factories, key=lambda x: x.id)
+        '''Return own factories sorted by id, as a shared tuple'''
+        if self._factories_count != len(self.board.factories):
+            factories = [x for x in self.board.factories.values() if x.player_id == self.id]
+            self._factories = tuple(sorted(factories, key=lambda x: x.id))
+            self._factories_count = len(self.board.factories)
+        return self._factories
 
-    def units(self):
-        units = [x for x in self.board.units.values() if x.player_id == self.id]
-        return sorted(units, key=lambda x: x.id)
+    def units(self, unit_type=None):
+        '''Return own units (of unit_type, if given) sorted by id, as a shared tuple'''
+        if self._units_count != len(self.board.units):
+            units = sorted([x for x in self.board.units.values() if x.player_id == self.id],
+                           key=lambda x: x.id)
+            self._units = tuple(units)
+            self._units_by_type = {'LIGHT': tuple(u for u in units if u.type == 'LIGHT'),
+                                   'HEAVY': tuple(u for u in units if u.type == 'HEAVY')}
+            self._units_count = len(self.board.units)
+        return self._units if unit_type is None else self._units_by_type[unit_type]
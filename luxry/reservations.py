@@ -0,0 +1,39 @@
+from .util import C
+
+
+class ReservationTable:
+    '''Space-time reservations of cells by units over the FUTURE_LEN horizon.
+
+    Cell::unit_id remains the record of which unit occupies each cell at each step index. This
+    table keeps the derived data that move safety checks would otherwise gather by scanning
+    neighbors:
+      open_neighbors[cell_id]: neighbors that are not opp factory cells (static)
+      reserved_neighbors[i][cell_id]: of those, how many are reserved at step index i
+    "Opp" is relative to board.player, matching Cell::moves_available().
+    '''
+    def __init__(self, board):
+        n = len(board.cells)
+        self.board = board
+        last = board.size - 1
+        self.blocked = [False] * n
+        self.open_neighbors = [4 - (c.x == 0) - (c.x == last) - (c.y == 0) - (c.y == last)
+                               for c in board.cells]
+        for factory in board.opp.factories():
+            for cell in [factory.cell()] + factory.cells():
+                self.blocked[cell.id] = True
+                for neighbor in cell.neighbors():
+                    self.open_neighbors[neighbor.id] -= 1
+        self.reserved_neighbors = [[0] * n for _ in range(C.FUTURE_LEN + 1)]
+
+    def reserve(self, step, cell):
+        '''Called by Cell::register_unit() when cell becomes reserved at step'''
+        i = step - self.board.step
+        if not self.blocked[cell.id]:
+            reserved_neighbors = self.reserved_neighbors[i]
+            for neighbor in cell.neighbors():
+                reserved_neighbors[neighbor.id] += 1
+
+    def open_moves(self, step, cell):
+        '''Return the number of non-opp-factory neighbors of cell not reserved at step+1'''
+        i = step - self.board.step
+        return self.open_neighbors[cell.id] - self.reserved_neighbors[i+1][cell.id]
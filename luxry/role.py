@@ -6,6 +6,8 @@ from .util import C, Resource, log, serialize_obj, deserialize_obj
 
 
 class Role:
+    __slots__ = ('unit', 'goal', 'set_role_step')
+
     def __init__(self, step, unit):
         self.unit = unit
         self.goal = None # Cell, Unit, or Factory
@@ -57,20 +59,7 @@ class Role:
 
     @classmethod
     def _get_threat_units(cls, cell, history_len=3, max_radius=2, heavy=False, light=False):
-        board = cell.board
-
-        opp_units = []
-        for radius_cell, _ in cell.radius_cells(min_radius=0, max_radius=max_radius):
-            for j in range(board.step, max(-1, board.step - history_len), -1):
-                uid = radius_cell.unit_history[j]
-                if uid in board.units:
-                    unit = board.units[uid]
-                    if not ((heavy and unit.type == 'HEAVY') or (light and unit.type == 'LIGHT')):
-                        continue
-                    if unit.player_id == board.player.id:
-                        continue
-                    opp_units.append(unit)
-        return opp_units
+        return cell.board.opp_context.threat_units(cell, history_len, max_radius, heavy, light)
 
     @classmethod
     def _handle_displaced_unit(cls, step, cell):
@@ -11,6 +11,8 @@ class RoleAntagonizer(Role):
     '''Shut down opponent-utilized resource cells'''
     NAME = 'antagonizer'
 
+    __slots__ = ('factory', 'target_cell', 'chain', 'target_factory', '_can_destroy_factory')
+
     def __init__(self, step, unit, factory, target_cell, chain=False, target_factory=None, goal=None):
         super().__init__(step, unit)
         self.factory = factory
@@ -63,9 +65,7 @@ class RoleAntagonizer(Role):
         factory = unit.assigned_factory or cur_cell.nearest_factory(board)
 
         if max_count:
-            like_antagonizers = [u for u in factory.units(step)
-                                 if u.type == unit.type and u.role and u.role.NAME == 'antagonizer']
-            if 1 + len(like_antagonizers) > max_count:
+            if 1 + factory.unit_count(step, unit.type, 'antagonizer') > max_count:
                 return
 
         # TODO also prioritize based on dist to opp factory, as those are more valuable
@@ -113,15 +113,14 @@ class RoleAntagonizer(Role):
                 return
 
         best_cell, min_dist = None, C.UNREACHABLE
-        for opp_unit in board.opp.units():
-            if opp_unit.is_chain():
-                cell = opp_unit.cell(board.step)
-                dist = cell.man_dist_factory(factory)
-                if (dist <= max_dist
-                    and dist < min_dist
-                    and not cell.assigned_unit(step)):
-                    #and cls._dest_is_safe(step, unit, cell)):
-                    best_cell, min_dist = cell, dist
+        for opp_unit in board.opp_context.chain_units:
+            cell = opp_unit.cell(board.step)
+            dist = cell.man_dist_factory(factory)
+            if (dist <= max_dist
+                and dist < min_dist
+                and not cell.assigned_unit(step)):
+                #and cls._dest_is_safe(step, unit, cell)):
+                best_cell, min_dist = cell, dist
         if best_cell:
             if i == 0:
                 log(f'{unit} antagonize chain at {best_cell}')
@@ -11,6 +11,8 @@ class RoleAttacker(Role):
     '''Pursue opp units'''
     NAME = 'attacker'
 
+    __slots__ = ('factory', 'target_unit', 'sidekick_unit', 'low_power_target', 'defender')
+
     def __init__(self, step, unit, factory, target_unit,
                  sidekick_unit=None, low_power_target=0, defender=0, goal=None):
         super().__init__(step, unit)
@@ -110,13 +112,14 @@ class RoleAttacker(Role):
                     return RoleAttacker(step, unit, player_factory, opp_ant, low_power_target=1)
 
         # Pursue units carrying water
-        for opp_unit in board.opp.units():
+        nearby_opp_units = board.spatial_index(step).units_within(
+            cur_cell, 14, board.opp.id,
+            light=(unit.type == 'LIGHT'), heavy=(unit.type == 'HEAVY'))
+        for opp_unit in nearby_opp_units:
             if (opp_unit.water[i] >= 5
-                and unit.type == opp_unit.type
                 and unit.power[i] >= opp_unit.power[i]
                 and not opp_unit.cell(step).factory()
-                and not opp_unit.assigned_unit(step)
-                and cur_cell.man_dist(opp_unit.cell(step)) < 15):
+                and not opp_unit.assigned_unit(step)):
                 log(f'{unit} attack {opp_unit} with {opp_unit.water[i]} water')
                 return RoleAttacker(step, unit, player_factory, opp_unit, low_power_target=1)
 
@@ -150,10 +153,8 @@ class RoleAttacker(Role):
         cur_cell = unit.cell(step)
         player_factory = unit.assigned_factory or cur_cell.nearest_factory(board)
 
-        for opp_unit in board.opp.units():
-            if (not opp_unit.low_power
-                or unit.type != opp_unit.type
-                or opp_unit.assigned_unit(step)):
+        for opp_unit in board.opp_context.low_power_units[unit.type]:
+            if opp_unit.assigned_unit(step):
                 continue
 
             destruct_cost = (opp_unit.cfg.SELF_DESTRUCT_COST
@@ -324,9 +325,7 @@ class RoleAttacker(Role):
         factory = unit.assigned_factory or cur_cell.nearest_factory(board)
 
         if max_count:
-            like_attackers = [u for u in factory.units(step)
-                              if u.type == unit.type and u.role and u.role.NAME == 'attacker']
-            if 1 + len(like_attackers) > max_count:
+            if 1 + factory.unit_count(step, unit.type, 'attacker') > max_count:
                 return
 
         # Only do this if opp has many lights or during endgame
@@ -379,12 +378,13 @@ class RoleAttacker(Role):
             return
 
         best_unit, best_score = None, C.UNREACHABLE
-        for opp_unit in board.opp.units():
+        nearby_opp_units = board.spatial_index(step).units_within(
+            cur_cell, 9, board.opp.id,
+            light=(unit.type == 'LIGHT'), heavy=(unit.type == 'HEAVY'))
+        for opp_unit in nearby_opp_units:
             opp_cell = opp_unit.cell(step)
             opp_dist = opp_cell.man_dist(cur_cell)
-            if (unit.type != opp_unit.type
-                or opp_dist >= 10
-                or opp_cell.factory()
+            if (opp_cell.factory()
                 or opp_unit.assigned_unit(step)):
                 continue
 
@@ -13,6 +13,11 @@ class RoleBlockade(Role):
     '''Prevent opp units with water from reaching ice conflict target factory'''
     NAME = 'blockade'
 
+    __slots__ = ('factory', 'target_unit', 'target_factory', 'partner',
+                 'last_transporter_factory_id', 'last_transporter_step', '_target_route',
+                 '_goal_cell', '_is_primary', '_push', '_avoid', '_next_goals', '_force_direction',
+                 '_straightline')
+
     def __init__(self, step, unit, factory, target_unit, target_factory, partner,
                  last_transporter_factory_id=None,
                  last_transporter_step=None,
@@ -127,13 +132,12 @@ class RoleBlockade(Role):
         if len(blockades) >= max_count:
             return
 
-        for opp_unit in board.opp.units():
-            if (opp_unit.type != 'LIGHT'
-                or (opp_unit.water[i] < 5
-                    and not any((spec[0] == Action.PICKUP
-                                 and spec[2] == Resource.WATER
-                                 and spec[3] >= 5)
-                                 for spec in opp_unit.action_queue[:5]))
+        for opp_unit in board.opp.units('LIGHT'):
+            if ((opp_unit.water[i] < 5
+                 and not any((spec[0] == Action.PICKUP
+                              and spec[2] == Resource.WATER
+                              and spec[3] >= 5)
+                             for spec in opp_unit.action_queue[:5]))
                 or opp_unit.cell(step).factory() is factory.mode.opp_factory):
                 continue
 
@@ -184,9 +188,8 @@ class RoleBlockade(Role):
 
         # TODO: do more to prefer real pickup vs AQ pickup?
         cur_target_route = None
-        for opp_unit in board.opp.units():
-            if (opp_unit.type != 'LIGHT'
-                or opp_unit is unit.role.target_unit
+        for opp_unit in board.opp.units('LIGHT'):
+            if (opp_unit is unit.role.target_unit
                 or (opp_unit.water[i] < 5
                     and not any((spec[0] == Action.PICKUP
                                  and spec[2] == Resource.WATER
@@ -365,10 +368,9 @@ class RoleBlockade(Role):
         end_cell = target_route[-1]
         if end_cell.factory() is not self.target_factory:
             # Slight preference toward a straight line route
-            end_route = board.route(
+            _, _, end_route = board.dist_bidirectional(
                 step, end_cell, self.target_unit,
-                dest_cell=self.target_factory.cell(),
-                dest_cond=lambda s,c: (c.factory() is self.target_factory),
+                [self.target_factory.cell()] + self.target_factory.cells(),
                 avoid_cond=lambda s,c: ((c.factory() and c.factory().player_id == self.unit.player_id)
                                         or (avoid_self and c.man_dist(cur_cell) == 1)),
                 unit_move_cost=1, unit_rubble_movement_cost=0.0375)
@@ -564,7 +566,7 @@ class RoleBlockade(Role):
                 and threat.action_queue[0][0] == Action.MOVE
                 and threat.action_queue[0][1] != Direction.CENTER):
                 direction = threat.action_queue[0][1]
-                probable_cells.add(threat_cell.neighbor(*C.MOVE_DELTAS[direction]))
+                probable_cells.add(threat_cell.neighbor_in(direction))
             elif threat.type == 'HEAVY':
                 probable_cells.add(threat_cell)
 
@@ -588,8 +590,8 @@ class RoleBlockade(Role):
         # any neighbor is between target unit and target factory is maintained
         best_direction, best_next_cell, best_score = None, None, 0
         for direction in range(Direction.MIN+1, Direction.MAX+1):
-            next_cell1 = cur_cell.neighbor(*C.MOVE_DELTAS[direction])
-            next_cell2 = par_cell.neighbor(*C.MOVE_DELTAS[direction])
+            next_cell1 = cur_cell.neighbor_in(direction)
+            next_cell2 = par_cell.neighbor_in(direction)
             if (next_cell1
                 and next_cell2
                 and not next_cell1.unit(step+1)
@@ -718,7 +720,7 @@ class RoleBlockade(Role):
                 self._goal_cell = cur_cell
                 self._force_direction = step, Direction.CENTER
             else:
-                self._goal_cell = cur_cell.neighbor(*C.MOVE_DELTAS[next_goals[0]]) or cur_cell
+                self._goal_cell = cur_cell.neighbor_in(next_goals[0]) or cur_cell
                 self._force_direction = step, cur_cell.neighbor_to_direction(self._goal_cell)
             if len(next_goals) > 1:
                 next_goals = next_goals[1:]
@@ -901,7 +903,7 @@ class RoleBlockade(Role):
                             # If primary is avoiding a threat, move the same direction
                             direction = self.partner.role._avoid
                             self._force_direction = (step, direction)
-                            self._goal_cell = cur_cell.neighbor(*C.MOVE_DELTAS[direction])
+                            self._goal_cell = cur_cell.neighbor_in(direction)
                             log(f'secondary {self.unit} avoid {direction}')
                             return self._goal_cell
                         elif self.partner.role._push:
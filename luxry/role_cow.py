@@ -11,6 +11,8 @@ class RoleCow(Role):
     '''Clear rubble'''
     NAME = 'cow'
 
+    __slots__ = ('factory', 'rubble_cell', 'repair')
+
     def __init__(self, step, unit, factory, rubble_cell, repair=0, goal=None):
         super().__init__(step, unit)
         self.factory = factory
@@ -175,9 +177,7 @@ class RoleCow(Role):
         factory = unit.assigned_factory or unit.cell(step).nearest_factory(board)
 
         if max_count:
-            factory_cows = [u for u in factory.units(step)
-                            if u.type == unit.type and u.role and u.role.NAME == 'cow']
-            if 1 + len(factory_cows) > max_count:
+            if 1 + factory.unit_count(step, unit.type, 'cow') > max_count:
                 return
 
         # Give priority to routes currently being mined by heavies
@@ -216,9 +216,7 @@ class RoleCow(Role):
         factory = unit.assigned_factory or unit.cell(step).nearest_factory(board)
 
         if max_count:
-            factory_cows = [u for u in factory.units(step)
-                            if u.type == unit.type and u.role and u.role.NAME == 'cow']
-            if 1 + len(factory_cows) > max_count:
+            if 1 + factory.unit_count(step, unit.type, 'cow') > max_count:
                 return
 
         # TODO: maybe worth doing if allows lichen spread away from opps?
@@ -270,12 +268,10 @@ class RoleCow(Role):
         factory = unit.assigned_factory or unit.cell(step).nearest_factory(board)
 
         if max_count:
-            factory_cows = [u for u in factory.units(step)
-                            if u.type == unit.type and u.role and u.role.NAME == 'cow']
-            if 1 + len(factory_cows) > max_count:
+            if 1 + factory.unit_count(step, unit.type, 'cow') > max_count:
                 return
 
-        route = unit.board.route(
+        route = board.route(
             step, target_cell, None,
             dest_cell=factory.cell(),
             dest_cond=lambda s,c: (c.factory() is factory),
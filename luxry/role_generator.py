@@ -10,6 +10,8 @@ class RoleGenerator(Role):
     '''Return to factory to generator and be re-assigned'''
     NAME = 'generator'
 
+    __slots__ = ('factory', 'station_cell')
+
     def __init__(self, step, unit, factory, station_cell, goal=None):
         super().__init__(step, unit)
         self.factory = factory
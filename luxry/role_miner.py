@@ -13,6 +13,8 @@ class RoleMiner(Role):
 
     FORGE_DIST = 5  # TODO A/B test
 
+    __slots__ = ('factory', 'resource_cell')
+
     def __init__(self, step, unit, factory, resource_cell, goal=None):
         super().__init__(step, unit)
         self.factory = factory
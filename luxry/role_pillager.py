@@ -11,6 +11,8 @@ class RolePillager(Role):
     '''Pillage lichen around opponent factories'''
     NAME = 'pillager'
 
+    __slots__ = ('factory', 'lichen_cell', 'one_way')
+
     def __init__(self, step, unit, factory, lichen_cell, one_way=False, goal=None):
         super().__init__(step, unit)
         self.factory = factory
@@ -163,8 +165,8 @@ class RolePillager(Role):
         player_factory = cur_cell.factory()
         light_lim = C.LIGHT_LIM + (step // 100)
         #light_lim = min(light_lim, C.LIGHT_LIM + 2)
-        light_count = len([u for u in player_factory.units(step)
-                           if u.type == 'LIGHT' and (not u.role or u.role.NAME != 'relocate')])
+        light_count = (player_factory.unit_count(step, 'LIGHT')
+                       - player_factory.unit_count(step, 'LIGHT', 'relocate'))
 
         if light_count > light_lim:
             return cls.from_lichen_cell_count(step, unit, one_way=True)
@@ -186,9 +188,7 @@ class RolePillager(Role):
             max_dist = unit.role.lichen_cell.man_dist_factory(player_factory) + 5
 
         if max_count:
-            like_pillagers = [u for u in player_factory.units(step)
-                              if u.type == unit.type and u.role and u.role.NAME == 'pillager']
-            if 1 + len(like_pillagers) > max_count:
+            if 1 + player_factory.unit_count(step, unit.type, 'pillager') > max_count:
                 return
 
         cells = []
@@ -293,9 +293,7 @@ class RolePillager(Role):
             max_dist = unit.role.lichen_cell.man_dist_factory(player_factory) + 10
 
         if max_count:
-            like_pillagers = [u for u in player_factory.units(step)
-                              if u.type == unit.type and u.role and u.role.NAME == 'pillager']
-            if 1 + len(like_pillagers) > max_count:
+            if 1 + player_factory.unit_count(step, unit.type, 'pillager') > max_count:
                 return
 
         cells = []
@@ -9,6 +9,8 @@ class RoleProtector(Role):
     '''Protect heavy miners while they dig'''
     NAME = 'protector'
 
+    __slots__ = ('miner_unit', 'factory_cell', 'last_strike', 'should_strike_ret', 'threat_count')
+
     def __init__(self, step, unit, miner_unit, factory_cell, last_strike=-C.UNREACHABLE, goal=None):
         super().__init__(step, unit)
         self.miner_unit = miner_unit
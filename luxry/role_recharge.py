@@ -11,6 +11,8 @@ class RoleRecharge(Role):
     '''Return to factory to recharge and be re-assigned'''
     NAME = 'recharge'
 
+    __slots__ = ('factory',)
+
     def __init__(self, step, unit, factory):
         super().__init__(step, unit)
         self.factory = factory
@@ -10,6 +10,8 @@ class RoleRelocate(Role):
     '''Reposition unit to new factory'''
     NAME = 'relocate'
 
+    __slots__ = ('factory', 'target_factory')
+
     def __init__(self, step, unit, factory, target_factory, goal=None):
         super().__init__(step, unit)
         self.factory = factory
@@ -50,8 +52,7 @@ class RoleRelocate(Role):
         if not factory.mode or factory.mode.NAME != 'forge':
             return
 
-        like_units = [u for u in factory.units(step) if u.type == unit.type]
-        if len(like_units) <= 4:
+        if factory.unit_count(step, unit.type) <= 4:
             return
 
         best_factory, min_dist = None, C.UNREACHABLE
@@ -106,11 +107,9 @@ class RoleRelocate(Role):
             return
 
         unit_threshold, relocate_lim = (3, 1) if unit.type == 'HEAVY' else (C.LIGHT_LIM-2, 2)
-        like_units = [u for u in factory.units(step) if u.type == unit.type]
-        if len(like_units) < unit_threshold:
+        if factory.unit_count(step, unit.type) < unit_threshold:
             return
-        likes_relocating = [u for u in like_units if u.role and u.role.NAME == 'relocate']
-        if len(likes_relocating) >= relocate_lim:
+        if factory.unit_count(step, unit.type, 'relocate') >= relocate_lim:
             return
 
         best_factory, min_dist = None, C.UNREACHABLE
@@ -141,9 +140,7 @@ class RoleRelocate(Role):
         factory = unit.assigned_factory or cur_cell.nearest_factory(board)
 
         unit_threshold, relocate_lim = (3, 1) if unit.type == 'HEAVY' else (C.LIGHT_LIM-2, 2)
-        like_units = [u for u in factory.units(step) if u.type == unit.type]
-        likes_relocating = [u for u in like_units if u.role and u.role.NAME == 'relocate']
-        if len(likes_relocating) >= relocate_lim:
+        if factory.unit_count(step, unit.type, 'relocate') >= relocate_lim:
             return
 
         best_factory, min_dist = None, C.UNREACHABLE
@@ -262,14 +259,14 @@ class RoleRelocate(Role):
 
         # If source factory exploded, just skip ahead and update assignment + invalidate
         if not self.factory:
-            self.unit.assigned_factory = self.target_factory
+            self.unit.assign_factory(self.target_factory)
             return False
 
         # After reaching target factory, update factory assignment and invalidate this role.
         cur_cell = self.unit.cell(step)
         if (self.goal is self.target_factory
             and cur_cell.man_dist_factory(self.target_factory) <= 1):
-            self.unit.assigned_factory = self.target_factory
+            self.unit.assign_factory(self.target_factory)
             return False
 
         return True
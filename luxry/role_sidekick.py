@@ -9,6 +9,8 @@ class RoleSidekick(Role):
     '''Help attacker pursue an opp unit'''
     NAME = 'sidekick'
 
+    __slots__ = ('factory', 'attacker_unit', 'target_unit')
+
     def __init__(self, step, unit, factory, attacker_unit, target_unit, goal=None):
         super().__init__(step, unit)
         self.factory = factory
@@ -15,6 +15,8 @@ class RoleTransporter(Role):
     # TODO: Currently we assume destination is a RoleMiner unit
     # TODO: Currently we determine amount later
     # TODO: Rename Miner(?)PowerTransporter
+    __slots__ = ('factory_cell', 'destination')
+
     def __init__(self, step, unit, factory_cell, destination, goal=None):
         super().__init__(step, unit)
         self.factory_cell = factory_cell
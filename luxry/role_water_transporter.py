@@ -17,6 +17,8 @@ class RoleWaterTransporter(Role):
     '''Move water from factory to factory'''
     NAME = 'water_transporter'
 
+    __slots__ = ('factory', 'target_factory')
+
     def __init__(self, step, unit, factory, target_factory, goal=None):
         super().__init__(step, unit)
         self.factory = factory
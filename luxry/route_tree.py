@@ -0,0 +1,104 @@
+import heapq
+import math
+
+from .util import C
+
+
+class RouteTree:
+    '''Incrementally repaired backward search tree rooted at a unit's goal cell (LPA*/D* Lite).
+
+    g[cell_id] is the cost of the cheapest route from the cell to goal. Because the tree is rooted
+    at the goal, a unit that moves or deviates from its route just reads g at its new cell; nothing
+    needs to be recalculated. When cell enter costs change (rubble dug/added, factories destroyed)
+    only the affected cells are updated. No heuristic is used, so the tree grows outward from the
+    goal only as far as the unit's current cell.
+    Only cell ids are stored so that trees can be persisted in Strategy across invocations.
+    Cells blocked by assignments etc. are not part of the tree; callers check them per move.
+    '''
+    def __init__(self, board, unit, goal_cell):
+        n = len(board.cells)
+        self.goal_id = goal_cell.id
+        self.player_id = unit.player_id
+        self.unit_move_cost = unit.cfg.MOVE_COST
+        self.unit_rubble_movement_cost = unit.cfg.RUBBLE_MOVEMENT_COST
+        self.g = [C.UNREACHABLE] * n
+        self.rhs = [C.UNREACHABLE] * n
+        self.enter_cost = self._enter_cost(board)
+        self.board_step = board.step
+        self.queue, self.heap_unique = [], 0  # key, unique, cell_id
+
+        self.rhs[self.goal_id] = 0
+        self._push(self.goal_id)
+
+    def _enter_cost(self, board):
+        '''Return [int] indexed by cell id; None if the cell cannot be entered (opp factory)'''
+        move_cost, rubble_cost = self.unit_move_cost, self.unit_rubble_movement_cost
+        enter_cost = [math.floor(move_cost + rubble_cost * r) for r in board.state.rubble[0]]
+        for factory in board.factories.values():
+            if factory.player_id != self.player_id:
+                for cell in [factory.cell()] + factory.cells():
+                    enter_cost[cell.id] = None
+        return enter_cost
+
+    def _push(self, cid):
+        self.heap_unique += 1
+        heapq.heappush(self.queue, (min(self.g[cid], self.rhs[cid]), self.heap_unique, cid))
+
+    def _update_cell(self, board, cid):
+        if cid != self.goal_id:
+            g, enter_cost = self.g, self.enter_cost
+            rhs = C.UNREACHABLE
+            for nid in board.adjacency.neighbor_ids[cid]:
+                if enter_cost[nid] is not None and g[nid] < C.UNREACHABLE:
+                    rhs = min(rhs, enter_cost[nid] + g[nid])
+            self.rhs[cid] = rhs
+        # Outdated heap entries are skipped when popped
+        if self.g[cid] != self.rhs[cid]:
+            self._push(cid)
+
+    def update(self, board):
+        '''Update enter costs for a new invocation and mark the affected cells for repair'''
+        if board.step == self.board_step:
+            return
+        self.board_step = board.step
+        enter_cost = self._enter_cost(board)
+        changed = [cid for cid, (prev, cur) in enumerate(zip(self.enter_cost, enter_cost))
+                   if prev != cur]
+        self.enter_cost = enter_cost
+
+        # A changed enter cost affects every route that steps onto the cell, i.e. its neighbors
+        neighbor_ids = board.adjacency.neighbor_ids
+        for cid in changed:
+            for nid in neighbor_ids[cid]:
+                self._update_cell(board, nid)
+
+    def cost(self, board, cell):
+        '''Return the cost of the cheapest route from cell to goal, repairing the tree as needed'''
+        g, rhs, queue, cid = self.g, self.rhs, self.queue, cell.id
+        neighbor_ids = board.adjacency.neighbor_ids
+        while queue and (queue[0][0] < min(g[cid], rhs[cid]) or g[cid] != rhs[cid]):
+            key, _, uid = heapq.heappop(queue)
+            if g[uid] == rhs[uid] or key != min(g[uid], rhs[uid]):
+                continue
+            if g[uid] > rhs[uid]:
+                g[uid] = rhs[uid]
+                for nid in neighbor_ids[uid]:
+                    self._update_cell(board, nid)
+            else:
+                g[uid] = C.UNREACHABLE
+                self._update_cell(board, uid)
+                for nid in neighbor_ids[uid]:
+                    self._update_cell(board, nid)
+        return g[cid]
+
+    def route(self, board, cell):
+        '''Return [Cell] from cell to goal following the tree, or [] if unreachable'''
+        if self.cost(board, cell) >= C.UNREACHABLE:
+            return []
+        g, enter_cost = self.g, self.enter_cost
+        route = [cell]
+        while cell.id != self.goal_id:
+            cell = min((n for n in cell.neighbors() if enter_cost[n.id] is not None),
+                       key=lambda n: enter_cost[n.id] + g[n.id])
+            route.append(cell)
+        return route
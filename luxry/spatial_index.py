@@ -0,0 +1,85 @@
+class SpatialIndex:
+    '''Unit positions at one simulated step, bucketed for radius and nearest-unit queries.
+
+    Player units are placed at step, opp units (not simulated) at board.step, as in
+    Cell::nearest_unit(). Units are grouped by (player_id, type) into BLOCK x BLOCK blocks of
+    cells, so a query only visits the blocks overlapping its search area instead of every unit.
+    Query results are ordered by unit id, matching Player::units().
+    '''
+    BLOCK = 8
+
+    def __init__(self, board, step):
+        self.board = board
+        self.step = step
+        self.width = (board.size + self.BLOCK - 1) // self.BLOCK
+        self.blocks = {}  # {(player_id, type): [[(unit, cell), ..] per block]}
+        self.order = {}  # {unit_id: index in board.units}, for tie-breaks matching board.units
+
+        player_id = board.player.id if board.player else None
+        for k, unit in enumerate(board.units.values()):
+            self.order[unit.id] = k
+            pos_step = step if unit.player_id == player_id else board.step
+            if unit.x[pos_step - board.step] is None:
+                continue  # built during this step; not on the board yet
+            cell = unit.cell(pos_step)
+            key = (unit.player_id, unit.type)
+            if key not in self.blocks:
+                self.blocks[key] = [[] for _ in range(self.width * self.width)]
+            block_id = (cell.y // self.BLOCK) * self.width + cell.x // self.BLOCK
+            self.blocks[key][block_id].append((unit, cell))
+
+    def _keys(self, player_id, light, heavy):
+        if player_id == 'all':
+            player_ids = [self.board.player.id, self.board.opp.id]
+        else:
+            player_ids = [player_id]
+        types = (['LIGHT'] if light else []) + (['HEAVY'] if heavy else [])
+        return [(p, t) for p in player_ids for t in types if (p, t) in self.blocks]
+
+    def units_within(self, cell, radius, player_id, light=True, heavy=True):
+        '''Return units of player_id ('all' for both) within man_dist radius of cell, by id'''
+        keys = self._keys(player_id, light, heavy)
+        if not keys:
+            return []
+
+        B, width = self.BLOCK, self.width
+        bx0, bx1 = max(0, (cell.x - radius) // B), min(width - 1, (cell.x + radius) // B)
+        by0, by1 = max(0, (cell.y - radius) // B), min(width - 1, (cell.y + radius) // B)
+        units = []
+        for key in keys:
+            blocks = self.blocks[key]
+            for by in range(by0, by1 + 1):
+                for bx in range(bx0, bx1 + 1):
+                    for unit, unit_cell in blocks[by * width + bx]:
+                        if abs(unit_cell.x - cell.x) + abs(unit_cell.y - cell.y) <= radius:
+                            units.append(unit)
+        units.sort(key=lambda u: u.id)
+        return units
+
+    def nearest_units(self, cell, player_id, light=True, heavy=True):
+        '''Return all units of player_id ('all' for both) at the minimum man_dist from cell'''
+        keys = self._keys(player_id, light, heavy)
+        if not keys:
+            return []
+
+        B, width = self.BLOCK, self.width
+        cbx, cby = cell.x // B, cell.y // B
+        best_units, min_dist = [], None
+        for ring in range(width):
+            # Cells in blocks at this ring are at least (ring - 1) * B + 1 away
+            if min_dist is not None and ring > 0 and min_dist <= (ring - 1) * B:
+                break
+            for by in range(max(0, cby - ring), min(width - 1, cby + ring) + 1):
+                edge = by in (cby - ring, cby + ring)
+                for bx in range(max(0, cbx - ring), min(width - 1, cbx + ring) + 1):
+                    if not edge and bx not in (cbx - ring, cbx + ring):
+                        continue
+                    block_id = by * width + bx
+                    for key in keys:
+                        for unit, unit_cell in self.blocks[key][block_id]:
+                            dist = abs(unit_cell.x - cell.x) + abs(unit_cell.y - cell.y)
+                            if min_dist is None or dist < min_dist:
+                                best_units, min_dist = [unit], dist
+                            elif dist == min_dist:
+                                best_units.append(unit)
+        return best_units
@@ -1,5 +1,6 @@
 import sys
 
+from .plan_forecast import PlanForecast
 from .util import Action, Direction, Resource, log
 
 
@@ -10,6 +11,7 @@ class Strategy:
         self.modes = {}  # {factory_id: serialized Mode}
         self.roles = {}  # {unit_id: serialized Role}
         self.routes = {}  # {unit_id: list of cell_ids}
+        self.route_trees = {}  # {unit_id: RouteTree}
         self.unit_assigned_factories = {}  # {unit_id: factory_id}
         self.resource_assigned_factories = {}  # {cell_id: factory_id}
 
@@ -17,13 +19,18 @@ class Strategy:
         self.dead_units = set()  # {unit_id}
         self.dead_factories = set()  # {factory_id}
 
-        self.board_cache = {}  # {board_id: BoardCache}
+        self.board_cache = None  # BoardCache
+        self.unit_history = None  # UnitHistory
         self.cell_caches = {}  # {cell_id: CellCache}
         self.factory_caches = {}  # {factory_id: FactoryCache}
+        self.factory_maps = {}  # {tuple of factory_ids: FactoryMap}, reset if the factory set changes
+        self.factory_map_ids = set()  # {factory_id} that factory_maps were built for
+        self.plan_forecast = PlanForecast()  # only kept up to date if C.PLAN_STATS
 
     def check_dead_unit(self, unit_id):  # Has to be id because object no longer exists
         if unit_id not in self.dead_units:
             self.dead_units.add(unit_id)
+            self.route_trees.pop(unit_id, None)
             log(f'Unit died: {unit_id}')
 
     def check_dead_factory(self, factory_id):  # Has to be id because object no longer exists
@@ -98,17 +105,13 @@ class Strategy:
             cell_cache = self.cell_caches[cell.id]
             cell_cache.save_factory_dists(cell)
 
-    def save_cell_unit_history(self, board):
-        for cell in board.cells:
-            if cell.id not in self.cell_caches:
-                self.cell_caches[cell.id] = CellCache()
-            cell_cache = self.cell_caches[cell.id]
-            cell_cache.save_unit_history(cell)
-
 
 class BoardCache:
     def __init__(self, board):
-        pass
+        # Reused by Board::from_obs(); only per-invocation state is reset
+        self.size = board.size
+        self.cells = board.cells
+        self.state = board.state
 
 
 class CellCache:
@@ -120,7 +123,6 @@ class CellCache:
         self.lowland_size = 0
 
         self.factory_dists = None  # {factory_id: dist}
-        self.unit_history = None  # list of unit_ids
         self.ice_vuln_cell_ids = None  # list of cell_ids
 
         # TODO: Distance to all beginning-of-game flat regions
@@ -136,9 +138,6 @@ class CellCache:
     def save_factory_dists(self, cell):
         self.factory_dists = cell.factory_dists
 
-    def save_unit_history(self, cell):
-        self.unit_history = cell.unit_history
-
 
 class FactoryCache:
     def __init__(self):
@@ -2,8 +2,10 @@ from collections import defaultdict
 import math
 import sys
 
+from .board_state import timeline_tails
 from .cell import Cell
 from .entity import Entity
+from .route_tree import RouteTree
 from .util import C, Action, Direction, Resource, log, prandom, prandom_shuffle
 
 
@@ -15,6 +17,12 @@ def log_cond(unit):
 
 
 class Unit(Entity):
+    __slots__ = ('board', 'id', 'id_str', 'player_id', 'x', 'y', 'type', 'ice', 'ore', 'water',
+                 'metal', 'power', 'cfg', 'role', 'route', 'assigned_factory', 'low_power',
+                 'low_power_threshold', 'low_power_route', 'protectors', 'transporters',
+                 'init_power', '_mines', '_is_antagonized', '_is_chain', '_raw_action_queue',
+                 'action_queue', 'new_action_queue')
+
     def __init__(self, board, unit_id, player_id, x, y, unit_type,
                  ice, ore, water, metal, power, action_queue):
         super().__init__()
@@ -22,14 +30,15 @@ class Unit(Entity):
         self.id = unit_id
         self.id_str = f'unit_{unit_id}'
         self.player_id = player_id
-        self.x = [x] + [None] * C.FUTURE_LEN
-        self.y = [y] + [None] * C.FUTURE_LEN
+        zeros, nones, empty = timeline_tails()
+        self.x = [x] + nones
+        self.y = [y] + nones
         self.type = unit_type
-        self.ice = [ice] + [0] * C.FUTURE_LEN
-        self.ore = [ore] + [0] * C.FUTURE_LEN
-        self.water = [water] + [0] * C.FUTURE_LEN
-        self.metal = [metal] + [0] * C.FUTURE_LEN
-        self.power = [power] + [0] * C.FUTURE_LEN
+        self.ice = [ice] + zeros
+        self.ore = [ore] + zeros
+        self.water = [water] + zeros
+        self.metal = [metal] + zeros
+        self.power = [power] + zeros
 
         self.cfg = board.env_cfg.ROBOTS[unit_type]
         self.role = None
@@ -40,8 +49,10 @@ class Unit(Entity):
         self.low_power_threshold = None
         self.low_power_route = None
 
-        self.protectors = [[]] + [[] for _ in range(C.FUTURE_LEN)]
-        self.transporters = [[]] + [[] for _ in range(C.FUTURE_LEN)]
+        # Opp units are never simulated; they share read-only protector/transporter timelines
+        is_opp = board.player is not None and player_id != board.player.id
+        self.protectors = empty if is_opp else [[] for _ in range(C.FUTURE_LEN + 1)]
+        self.transporters = empty if is_opp else [[] for _ in range(C.FUTURE_LEN + 1)]
 
         # Used by Board::get_new_actions
         # This wouldn't be necessary if we had .power[] and .power_delta[]
@@ -52,7 +63,7 @@ class Unit(Entity):
 
         self._raw_action_queue = list(action_queue)
         self.action_queue = Action.expand_queue(self, action_queue)
-        self.new_action_queue = [None] * C.FUTURE_LEN
+        self.new_action_queue = None if is_opp else nones[:]
 
     def __repr__(self):
         return f'{self.type}{self.id}'
@@ -90,6 +101,7 @@ class Unit(Entity):
                     log(f'X! {self} {self.role}')
                 self.unset_role(step, lc=lc)
             self.role = role
+            self.board.unit_version += 1
             lc = lc or log_cond(self)
             if i == 0 and lc:
                 log(f'   {self} {self.role}')
@@ -103,6 +115,17 @@ class Unit(Entity):
             log(f'X  {self} {self.role}')
         self.role.unset_role(step)
         self.role = None
+        self.board.unit_version += 1
+
+    def clear_role(self):
+        '''Drop the role without Role::unset_role(); only before any role is validated/set'''
+        self.role = None
+        self.board.unit_version += 1
+
+    def assign_factory(self, factory):
+        if factory is not self.assigned_factory:
+            self.assigned_factory = factory
+            self.board.unit_version += 1
 
     def update_goal(self, step):
         i = step - self.board.step
@@ -322,7 +345,7 @@ class Unit(Entity):
         # Update next resource/power, and update affected recipient factory/unit
         # TODO: enforce limits (and probably warn if overflowing)
         i = step - self.board.step
-        cell = self.cell(step).neighbor(*C.MOVE_DELTAS[direction])
+        cell = self.cell(step).neighbor_in(direction)
         recipient = cell.factory() if cell.factory() else cell.unit(step+1)
         assert recipient
         cargo_lim = recipient.cfg.CARGO_SPACE if isinstance(recipient, Unit) else C.UNREACHABLE
@@ -405,10 +428,12 @@ class Unit(Entity):
         cell = self.cell(step)
         if cell.rubble[i] > 0:
             cell.rubble[i] -= min(self.cfg.DIG_RUBBLE_REMOVED, cell.rubble[i])
+            self.board.rubble_version += 1
         elif cell.lichen[i]: #  TODO
             cell.lichen[i] -= min(self.cfg.DIG_LICHEN_REMOVED, cell.lichen[i])
             if cell.lichen[i] <= 0:
                 cell.rubble[i] += self.cfg.DIG_RUBBLE_REMOVED
+                self.board.rubble_version += 1
         elif cell.ice:
             self.ice[i] += self.cfg.DIG_RESOURCE_GAIN
         elif cell.ore:
@@ -455,8 +480,7 @@ class Unit(Entity):
                 break
             action, direction, _, _, _, _ = list(action_spec)
             if action == Action.MOVE:
-                move_delta = C.MOVE_DELTAS[direction]
-                cell = cell.neighbor(*move_delta)
+                cell = cell.neighbor_in(direction)
             elif action == Action.DIG:
                 if cell.ice or cell.ore:
                     if ice is None or (ice and cell.ice) or (not ice and cell.ore):
@@ -486,7 +510,7 @@ class Unit(Entity):
                     and n == 1
                     and prev_adr == (action, direction, repeat, n)):
                     break
-                cell = cell.neighbor(*C.MOVE_DELTAS[direction])
+                cell = cell.neighbor_in(direction)
                 prev_adr = (action, direction, repeat, n)
             else:
                 prev_adr = (action, direction, repeat, n)
@@ -511,7 +535,7 @@ class Unit(Entity):
             prev_cell = cell
             action, direction, _, _, _, _ = list(action_spec)
             if action == Action.MOVE:
-                cell = cell.neighbor(*C.MOVE_DELTAS[direction])
+                cell = cell.neighbor_in(direction)
             if not cell:
                 cell, future_steps = prev_cell, j
                 break
@@ -673,11 +697,62 @@ class Unit(Entity):
             #    log(f'{step} {self} (x) {cur_cell} -> ?? -> {goal_cell}; no route')
             pass
 
+        # Late step indexes may use a cheap greedy move instead (see C.LOD_PROFILES)
+        if 'straight_moves' in board.lod:
+            return self._straight_move(step, goal_cell), None
+
+        # Long-haul routes that are blocked or that the unit has deviated from are repaired.
+        if (C.ROUTE_REPAIR
+            and self.route
+            and self.route[-1] is goal_cell
+            and not goal_cell.factory_center
+            and cur_cell.man_dist(goal_cell) >= C.ROUTE_REPAIR_MIN_DIST):
+            move_cell = self._repair_route(step, goal_cell)
+            if move_cell:
+                return move_cell, None
+
         best_score = (C.UNREACHABLE,)*6
         best_ideal_score = (C.UNREACHABLE,)*6
         best_move, best_route, best_threats = cur_cell, None, None  # Default: no move
-        move_cell_options = cur_cell.neighbors()
+        move_cell_options = list(cur_cell.neighbors())
         prandom_shuffle(step + self.id, move_cell_options)
+
+        # Score every move_cell with a single backward search from goal_cell per avoidance level.
+        # Only the chosen move_cell needs an actual route, so that is deferred until the end.
+        # dist() substitutes a dest_cond for factory center goals, so those still search forward.
+        goal_costs = {}  # {level: {cell_id: cost}}
+        goal_cost_cells = [c for c in [cur_cell] + move_cell_options
+                           if not (c.factory() and c.factory().player_id != self.player_id)]
+        def goal_cost(level, move_cell, avoid_cond=None, avoid_mask=None,
+                      unit_rubble_movement_cost=None):
+            if goal_cell.factory_center:
+                cost, _, dest_cell = board.dist(
+                    step, move_cell, self,
+                    dest_cell=goal_cell,
+                    avoid_cond=avoid_cond,
+                    avoid_mask=avoid_mask,
+                    unit_rubble_movement_cost=unit_rubble_movement_cost)
+                return cost, (board._route(dest_cell) if dest_cell else [])
+            if level not in goal_costs:
+                goal_costs[level] = board.dist_to_goal(
+                    step, goal_cost_cells, self, goal_cell,
+                    avoid_cond=avoid_cond,
+                    avoid_mask=avoid_mask,
+                    unit_rubble_movement_cost=unit_rubble_movement_cost)
+            cost = goal_costs[level].get(move_cell.id, C.UNREACHABLE)
+            if cost == C.UNREACHABLE:
+                return cost, []
+            return cost, lambda: board.route(
+                step, move_cell, self,
+                dest_cell=goal_cell,
+                avoid_cond=avoid_cond,
+                avoid_mask=avoid_mask,
+                unit_rubble_movement_cost=unit_rubble_movement_cost)
+
+        # Parts of the avoidance levels that are fixed for the whole invocation are precomputed.
+        # The rest (e.g. cells assigned to other units) is checked per cell by the avoid_conds below.
+        careful_avoid_mask = board.avoid_mask('careful_light', self) if self.type == 'LIGHT' else None
+
         for move_cell in [cur_cell] + move_cell_options:
             # If move_cell is an opp factory cell, skip it.
             if move_cell.factory() and move_cell.factory().player_id != self.player_id:
@@ -723,44 +798,17 @@ class Unit(Entity):
                 return move_cell, None
 
             # Use an even safer route sometimes e.g. for water transporters
-            #   Stay at least 3-4 cells away from opp factories
+            #   Stay at least 3-4 cells away from opp factories (very_safe_avoid_mask)
             very_safe_avoid_cond = lambda s,c: (
-                c.man_dist_factory(c.nearest_factory(board, player_id=board.opp.id)) <= 3
-                or (c.assigned_unit(s)
-                    and c.assigned_unit(s) is not self)
+                (c.assigned_unit(s)
+                 and c.assigned_unit(s) is not self)
                 or (c.unit(step) and c.unit(step).role and c.unit(step).role.NAME == 'blockade'))
 
             # Normal level of avoidance:
-            #   Lights avoid factory centers, all assigned cells, and heavy opp miners
+            #   Lights avoid factory centers and heavy opp miners (careful_avoid_mask), and all
+            #   assigned cells
             #   Heavies avoid cells assigned to other heavies
-            careful_avoid_cond = lambda s,c: (
-                (self.type == 'LIGHT'
-                 and (c.factory_center
-                      # TODO this feels like an improvement, avoiding standoffs
-                      #or any(((x.ice or x.ore or x.factory())
-                      #        and x.unit(board.step)
-                      #        and (x.unit(board.step).type == 'HEAVY'
-                      #             or x.unit(board.step).power[0] > self.power[0])
-                      #        and x.unit(board.step).player_id == board.opp.id)
-                      #       for x in [c] + c.neighbors())))
-                      or any((x.unit(board.step)
-                              and (x.unit(board.step).type == 'HEAVY'
-                                   or x.unit(board.step).power[0] > self.power[0])
-                              and x.unit(board.step).player_id == board.opp.id
-                              and x.unit(board.step).is_stationary(board.step, 5))
-                             for x in [c] + c.neighbors())
-                      or ((c.ice or c.ore)
-                          and c.unit(board.step)
-                          and c.unit(board.step).type == 'HEAVY'
-                          and c.unit(board.step).player_id == board.opp.id)))
-                or (c.assigned_unit(s)
-                    and c.assigned_unit(s) is not self
-                    and ((self.type == 'LIGHT'
-                          and c.assigned_unit(s).role
-                          and c.assigned_unit(s).role.NAME != 'pillager')
-                         or c.assigned_unit(s).type == 'HEAVY'
-                         or (c.assigned_unit(s).role
-                             and c.assigned_unit(s).role.NAME == 'transporter'))))
+            careful_avoid_cond = self._careful_avoid_cond
 
             # Only avoid heavy miners when navigating less carefully.
             reckless_avoid_cond = lambda s,c: (
@@ -792,17 +840,20 @@ class Unit(Entity):
                      for c in goal_cell.neighbors()):
                 skip_careful_route = True
 
-            dest_cell = None
+            route = []
             cost1, cost2, cost3, cost4 = (C.UNREACHABLE,) * 4
             if (self.role
                 and self.role.NAME == 'water_transporter'
                 and ((self.water[i] >= 5 or self.ice[i] >= 50)
                      or self.role.goal is self.role.target_factory)
+                and not board.avoid_mask('near_opp_factory')[move_cell.id]
                 and not very_safe_avoid_cond(step, move_cell)):
                 cost1, wt_dist, dest_cell = board.dist(
                     step, move_cell, self,
                     dest_cell=goal_cell,
-                    avoid_cond=very_safe_avoid_cond)
+                    avoid_cond=very_safe_avoid_cond,
+                    avoid_mask=board.avoid_mask('near_opp_factory'))
+                route = board._route(dest_cell) if dest_cell else []
 
                 # If this route is overly roundabout and we may miss our deadline, go for faster route
                 if ((self.water[i] >= 5 or self.ice[i] >= 50)
@@ -811,11 +862,9 @@ class Unit(Entity):
 
             if (cost1 == C.UNREACHABLE
                 and not skip_careful_route
+                and not (careful_avoid_mask and careful_avoid_mask[move_cell.id])
                 and not careful_avoid_cond(step, move_cell)):
-                cost2, _, dest_cell = board.dist(
-                    step, move_cell, self,
-                    dest_cell=goal_cell,
-                    avoid_cond=careful_avoid_cond)
+                cost2, route = goal_cost(2, move_cell, careful_avoid_cond, careful_avoid_mask)
 
             # If goal_cost is unreachable, call again without avoiding assigned cells and use that
             # to break ties between various unreachable cost moves.
@@ -826,21 +875,13 @@ class Unit(Entity):
                                          else None)
             if (cost1 == cost2 == C.UNREACHABLE
                 and not reckless_avoid_cond(step, move_cell)):
-                cost3, _, dest_cell = board.dist(
-                    step, move_cell, self,
-                    dest_cell=goal_cell,
-                    avoid_cond=reckless_avoid_cond,
-                    unit_rubble_movement_cost=unit_rubble_movement_cost)
+                cost3, route = goal_cost(3, move_cell, reckless_avoid_cond,
+                                         unit_rubble_movement_cost=unit_rubble_movement_cost)
 
             # If goal_cost is unreachable, call again without avoiding assigned cells and use that
             # to break ties between various unreachable cost moves.
             if cost1 == cost2 == cost3 == C.UNREACHABLE:
-                cost4, _, dest_cell = board.dist(
-                    step, move_cell, self,
-                    dest_cell=goal_cell)
-
-            # Grab the route used by the last call to dist().
-            route = board._route(dest_cell) if dest_cell else []
+                cost4, route = goal_cost(4, move_cell)
 
             # Calculate cost of moving 0-1 cells to get from self to move_cell.
             move_cost = 0 if cur_cell is move_cell else (
@@ -865,6 +906,8 @@ class Unit(Entity):
             if score < best_score:
                 best_score, best_move, best_route = score, move_cell, route
 
+        if callable(best_route):
+            best_route = best_route()
         self.route = best_route or []
         if i == 0 and best_score[0] > 0:
             log(f'{self} risky move to {best_move}: {best_score[0]}')
@@ -873,6 +916,67 @@ class Unit(Entity):
         #   log(f'{self} {cur_cell} -> {best_move} -> {goal_cell}; score={best_score} !{best_threats}')
         return best_move, (best_threats if i == 0 else None)
 
+    def _careful_avoid_cond(self, step, cell):
+        '''Normal level of avoidance for goal_to_move(); see careful_avoid_cond there'''
+        assigned_unit = cell.assigned_unit(step)
+        return (assigned_unit
+                and assigned_unit is not self
+                and ((self.type == 'LIGHT'
+                      and assigned_unit.role
+                      and assigned_unit.role.NAME != 'pillager')
+                     or assigned_unit.type == 'HEAVY'
+                     or (assigned_unit.role
+                         and assigned_unit.role.NAME == 'transporter')))
+
+    def _repair_route(self, step, goal_cell):
+        '''Return a safe move_cell along this unit's persisted RouteTree to goal_cell, or None
+
+        Candidate moves get the same checks as the careful level of goal_to_move(). Water
+        transporters use the very safe level instead, so they are not repaired.
+        '''
+        board = self.board
+        i = step - board.step
+        cur_cell = self.cell(step)
+        if self.role and self.role.NAME == 'water_transporter':
+            return
+
+        route_trees = board.strategy.route_trees
+        tree = route_trees.get(self.id)
+        if tree is None or tree.goal_id != goal_cell.id:
+            tree = RouteTree(board, self, goal_cell)
+            route_trees[self.id] = tree
+        else:
+            tree.update(board)
+
+        cur_cost = tree.cost(board, cur_cell)
+        if cur_cost >= C.UNREACHABLE:
+            return
+
+        # Only accept detours that are not much more expensive than the unblocked route.
+        # The tree uses observed rubble; the first move is costed with this step's rubble.
+        careful_avoid_mask = board.avoid_mask('careful_light', self) if self.type == 'LIGHT' else None
+        cur_cell_taken = cur_cell.unit(step + 1)
+        best_cell, min_cost = None, cur_cost + C.ROUTE_REPAIR_SLACK * self.cfg.MOVE_COST
+        for move_cell in cur_cell.neighbors():
+            if (tree.enter_cost[move_cell.id] is None
+                or (careful_avoid_mask and careful_avoid_mask[move_cell.id])
+                or self._careful_avoid_cond(step, move_cell)
+                or not move_cell.safe_to_move(step, self)
+                or self.threatened_by_opp(step, move_cell)[0]):
+                continue
+            move_cost = self.move_cost(step, self._neighbor_to_direction(step, move_cell))[0]
+            if cur_cell_taken and self.power[i] < move_cost:
+                continue
+            enter_cost = math.floor(self.cfg.MOVE_COST
+                                    + self.cfg.RUBBLE_MOVEMENT_COST * move_cell.rubble[i])
+            cost = enter_cost + tree.cost(board, move_cell)
+            if cost < min_cost:
+                best_cell, min_cost = move_cell, cost
+
+        if best_cell:
+            self.route = tree.route(board, best_cell)
+            return best_cell
+
     def _opp_collision_risk_value(self, step, opp_unit, move_cell):
         board = self.board
         i = step - board.step
@@ -906,7 +1010,7 @@ class Unit(Entity):
         if len(opp_unit.action_queue) >= 1:
             if opp_unit.action_queue[0][0] == Action.MOVE:
                 direction = opp_unit.action_queue[0][1]
-                opp_plan_cell = opp_cell.neighbor(*C.MOVE_DELTAS[direction])
+                opp_plan_cell = opp_cell.neighbor_in(direction)
             else:
                 opp_plan_cell = opp_cell
             if opp_plan_cell is move_cell:
@@ -919,20 +1023,41 @@ class Unit(Entity):
                       + (-90 if opp_threatened_at_cell else 0))
         return max(5, risk_value)
 
+    def _straight_move(self, step, goal_cell):
+        '''Return the safe neighbor (or cur_cell) closest to goal_cell, preferring low rubble'''
+        i = step - self.board.step
+        cur_cell = self.cell(step)
+        goal_factory = goal_cell.factory() if goal_cell.factory_center else None
+
+        best_move, best_score = cur_cell, None
+        for move_cell in [cur_cell] + cur_cell.neighbors():
+            if move_cell.factory() and move_cell.factory().player_id != self.player_id:
+                continue
+            if not move_cell.safe_to_move(step, self):
+                continue
+            dist = (move_cell.man_dist_factory(goal_factory) if goal_factory
+                    else move_cell.man_dist(goal_cell))
+            score = (dist, move_cell.rubble[i])
+            if best_score is None or score < best_score:
+                best_move, best_score = move_cell, score
+        return best_move
+
     def threatened_by_opp(self, step, move_cell, all_collisions=False):
         '''Returns a threat value: 0 for perfectly safe, higher for more danger'''
         i = step - self.board.step
         if move_cell.factory() and move_cell.factory().player_id == self.player_id:
             return 0, []
+        if 'skip_threats' in self.board.lod:
+            return 0, []
 
         risk_value = 0
         threatening_units = []
         cur_cell = self.cell(step)
         is_my_move = cur_cell is not move_cell
 
-        for neighbor in [move_cell] + move_cell.neighbors():
-            unit = neighbor.unit(self.board.step)
-            if unit and unit.player_id != self.player_id:
+        # Units at board.step around move_cell are the same for every step index
+        for neighbor, unit in self.board.opp_context.neighbor_units(move_cell):
+            if unit.player_id != self.player_id:
                 # No threat from lighter unit
                 if (self.type == 'HEAVY' and unit.type == 'LIGHT') and not all_collisions:
                     continue
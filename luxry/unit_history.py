@@ -0,0 +1,74 @@
+from array import array
+
+
+class UnitHistory:
+    '''Which unit was on each cell at every observed step, plus recent opp traffic per cell.
+
+    planes[step] is an int16 array indexed by cell id (-1 for no unit), or None if step was not
+    observed; indexing with a negative step wraps around like the old per-cell lists did.
+    light_traffic/heavy_traffic[cell_id] count the steps in the last TRAFFIC_LEN that a (still
+    alive) opp unit of that type was on the cell. They are updated by .record() once per turn, so
+    Cell::traffic() is a lookup. Persisted in Strategy across invocations. array('h') keeps up to
+    1000 planes at 2 bytes per cell, and its scalar reads are faster than a numpy matrix's.
+    '''
+    STEPS = 1000
+    TRAFFIC_LEN = 50
+
+    def __init__(self, size):
+        self.size = size
+        self.planes = [None] * self.STEPS
+        self.light_traffic = [0] * (size * size)
+        self.heavy_traffic = [0] * (size * size)
+        self._opp_positions = {}  # {step: [(unit_id, cell_id, is_heavy)]} within the traffic window
+        self._opp_alive = set()  # {unit_id} of opp units currently counted in the traffic maps
+
+    def record(self, board):
+        '''Save unit positions at board.step and update traffic counts'''
+        step = board.step
+        plane = array('h', [-1]) * (self.size * self.size)
+        for unit in board.units.values():
+            plane[unit.cell(step).id] = unit.id  # unit ids are small; OverflowError otherwise
+        self.planes[step] = plane
+
+        # Opp units that died since the last record no longer count for any step
+        opp_alive = set()
+        positions = []
+        for unit in board.opp.units():
+            opp_alive.add(unit.id)
+            positions.append((unit.id, unit.cell(step).id, unit.type == 'HEAVY'))
+        dead = self._opp_alive - opp_alive
+        if dead:
+            for s, entries in self._opp_positions.items():
+                self._update_traffic([e for e in entries if e[0] in dead], -1)
+                self._opp_positions[s] = [e for e in entries if e[0] not in dead]
+
+        # Slide the window: drop steps that fell out of it (or are being re-recorded), add this one
+        for old_step in [s for s in self._opp_positions
+                         if s <= step - self.TRAFFIC_LEN or s == step]:
+            self._update_traffic(self._opp_positions.pop(old_step), -1)
+        self._opp_positions[step] = positions
+        self._update_traffic(positions, 1)
+        self._opp_alive = opp_alive
+
+    def _update_traffic(self, entries, delta):
+        for _, cell_id, is_heavy in entries:
+            if is_heavy:
+                self.heavy_traffic[cell_id] += delta
+            else:
+                self.light_traffic[cell_id] += delta
+
+
+class HistoryField:
+    '''One cell's column of UnitHistory; history[step] is a unit id or None, like a list'''
+    __slots__ = ('planes', 'cell_id')
+
+    def __init__(self, history, cell_id):
+        self.planes = history.planes
+        self.cell_id = cell_id
+
+    def __getitem__(self, step):
+        plane = self.planes[step]
+        if plane is None:
+            return None
+        unit_id = plane[self.cell_id]
+        return unit_id if unit_id >= 0 else None
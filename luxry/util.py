@@ -30,6 +30,28 @@ class C:
     MOVE_DELTAS = [[0, 0], [0, -1], [1, 0], [0, 1], [-1, 0]]
     UNREACHABLE = 1000000 if PROD else 1000000000  # Exaggerate potential slowdowns while debugging
 
+    DIST_STATS = False  # log Board::dist() expansion counts per call site
+    PHASE_STATS = False  # log entities visited/acted per EntityGroup action phase
+    PLAN_STATS = False  # log how much of last turn's forecast for this step held (see PlanForecast)
+
+    # Incremental repair of blocked/deviated long-haul unit routes (see RouteTree)
+    ROUTE_REPAIR = False
+    ROUTE_REPAIR_MIN_DIST = 8  # only repair routes for units at least this far from their goal
+    ROUTE_REPAIR_SLACK = 2  # accept detours costing at most this many extra moves
+
+    # Level of detail for later step indexes of the simulation (see Board::begin_step_simulation)
+    # Each profile maps a simplification to the first step index it applies to; index 0 (the
+    # actions actually submitted) is always simulated in full. Compare with benchmark.lod_report().
+    #   skip_threats: Unit::threatened_by_opp() reports no threat
+    #   straight_moves: units without a valid route step greedily toward their goal
+    #   coarse_lichen: factory lichen info is carried over instead of recalculated each step
+    LOD_PROFILE = 'full'
+    LOD_PROFILES = {
+        'full': {},
+        'balanced': {'skip_threats': 20, 'coarse_lichen': 20},
+        'fast': {'skip_threats': 10, 'coarse_lichen': 10, 'straight_moves': 20},
+    }
+
     TIGGA = False #not PROD
     SIESTA = False #not PROD
     HARM = False #not PROD